@@ -1,4 +1,8 @@
+import hashlib
+import json
+import os
 import numpy
+import Files
 import plot
 
 #applied loads by car : m1 = locomotive, m2 = middle car, m3 = last car
@@ -8,98 +12,207 @@ m1, m2, m3 = 439, 289, 318 ##final load case
 #spacing constants between applied loads (as given from front of train) [offsets]
 spacing = [0, -176, -340, -516, -680, -856]
 
-#dimensions of bridge
-#length of bridge kept constant at 1250 mm long
+#a load closer than this (mm) to a station is taken to be on it
+station_tolerance = 1e-9
+
+#dimensions of bridge: span, supports and the stations at which diagrams are computed
+#everything that only depends on the geometry (stations, lever arm, influence lines) is computed once per beam
+class Beam:
+    #reactions found from statics alone, so only two supports (see ContinuousBeam for more)
+    indeterminate = False
+
+    def __init__(self, length=1250, supports=(25, 1225), resolution=1):
+        if len(supports) < 2 or (len(supports) > 2 and not self.indeterminate):
+            raise ValueError("Beam needs exactly two supports, got " + str(len(supports)))
+
+        self.length = length
+        self.supports = numpy.array(sorted(supports), dtype=float)
+        self.resolution = resolution
+
+        #stations every 'resolution' mm, from one end of the bridge to the other
+        #(station i is at exactly i * resolution, which station_index relies on, so resolution has to divide the span)
+        n = int(round(length / resolution))
+        if n < 1 or abs(n * resolution - length) > station_tolerance:
+            raise ValueError("resolution %g doesn't divide the span %g into whole stations" % (resolution, length))
+        self.stations = numpy.arange(n + 1) * float(resolution)
+
+        #distance between the supports, used to take moments around the first one
+        self.lever_arm = self.supports[-1] - self.supports[0]
+
+        #unit-load influence lines, filled in the first time they are needed
+        self.influence = {}
+
+    #everything about the beam that changes its diagrams, used to key cached envelopes
+    def key(self):
+        return {
+            "span" : self.length,
+            "supports" : self.supports.tolist(),
+            "resolution" : self.resolution,
+        }
+
+    #whether loads at x are on the bridge (loads right at the ends are ignored)
+    def on_bridge(self, x):
+        return (0 < x) & (x < self.length)
+
+    #reaction at every support caused by a 1 N downward load at x, as array (x..., supports)
+    #sum of moments around the first support, then sum(F_y) = 0
+    def reactions(self, x):
+        x = numpy.asarray(x, dtype=float)
+        b = (x - self.supports[0]) / self.lever_arm
+        return numpy.stack([1 - b, b], axis=-1) * self.on_bridge(x)[..., None]
+
+    #SFD at station s caused by a 1 N downward load at x (x and s broadcast together)
+    #forces at s count towards the shear at s, as in sfd
+    def shear_influence(self, x, s):
+        x = numpy.asarray(x, dtype=float)
+        s = numpy.asarray(s, dtype=float)
+        out = numpy.sum(self.reactions(x) * (s[..., None] >= self.supports), axis=-1)
+        return out - (s >= x) * self.on_bridge(x)
+
+    #BMD at station s caused by a 1 N downward load at x (x and s broadcast together)
+    def moment_influence(self, x, s):
+        x = numpy.asarray(x, dtype=float)
+        s = numpy.asarray(s, dtype=float)
+        out = numpy.sum(self.reactions(x) * numpy.maximum(s[..., None] - self.supports, 0), axis=-1)
+        return out - numpy.maximum(s - x, 0) * self.on_bridge(x)
+
+    #returns tuple of matrices (shear, moment), (load positions x stations)
+    #row i is the SFD / BMD caused by a 1 N downward load at station i, including the support reactions
+    #the first and last rows are zero, since loads at the very ends of the bridge are ignored
+    def influence_lines(self):
+        if not self.influence:
+            x = self.stations[:, None]
+            self.influence["shear"] = self.shear_influence(x, self.stations[None, :])
+            self.influence["moment"] = self.moment_influence(x, self.stations[None, :])
+        return self.influence["shear"], self.influence["moment"]
+
+    #row of the influence lines for loads at x, or None if some x on the bridge falls between stations
+    #(more than station_tolerance away from one)
+    #loads past the ends map onto the (zero) first and last rows
+    def station_index(self, x):
+        x = numpy.asarray(x, dtype=float)
+        i = numpy.clip(numpy.rint(x / self.resolution).astype(int), 0, len(self.stations) - 1)
+        off = numpy.abs(self.stations[i] - x) > station_tolerance
+        if numpy.any(off & (0 <= x) & (x <= self.length)):
+            return None
+        return i
+
+#the bridge: 1250 mm long, supported at x = 25 and x = 1225
+bridge = Beam(1250, (25, 1225))
 
 #interval at which the train is placed to generate SFE and BME
 sample_frequency = 1
 
+#folder holding envelopes already computed by cached_envelopes()
+#bump cache_version whenever the way envelopes are computed changes, so old files are not reused
+cache_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "envelope_cache")
+cache_version = 1
+
+#column order of the combined envelopes returned by envelopes()
+envelope_labels = ["MIN SFE (N)", "MAX SFE (N)", "SFE (N)", "MIN BME (N mm)", "MAX BME (N mm)", "BME (N mm)"]
+
+#applied load of every axle (N, positive down) for a load case given as car weights (m1, m2, m3)
+#each car rests on two axles, so half its weight goes to each
+#uses the car weights above when no load case is given
+def axle_loads(load_case=None):
+    if load_case is None: load_case = (m1, m2, m3)
+    return numpy.repeat(numpy.asarray(load_case, dtype=float), 2) / 2
+
+#returns tuple of arrays (offsets, loads) describing a train, one entry per axle
+#without offsets, load_case is car weights for the train in 'spacing'
+#with offsets (any train), load_case holds one load (N, positive down) per axle
+def train(load_case=None, offsets=None):
+    if offsets is None:
+        return numpy.array(spacing), axle_loads(load_case)
+    return numpy.asarray(offsets), numpy.asarray(load_case, dtype=float)
+
 #returns dictionary containing position (mm) and applied load at said position (N)
 #finds reaction forces for the train at a given position
-def find_reactions(pos):
+def find_reactions(pos, load_case=None, offsets=None, beam=None):
+    if beam is None: beam = bridge
     out = {}
+    offsets, loads = train(load_case, offsets)
 
-    #add all loads applied by train (using 'spacing')
-    for i in range (len(spacing)):
-        if not (0 < pos + spacing[i] < 1250): continue
-        if (i < 2):
-            out[pos + spacing[i]] = - m1 / 2
-            continue
-        elif (i < 4):
-            out[pos + spacing[i]] = - m2 / 2
-            continue
-        else:
-            out[pos + spacing[i]] = -m3 / 2
-            continue
-    
-    #initialize reaction force at x = 1225 (far end of bridge)
-    b = 0
-    #calculate sum of moments around point a (x = 25) and add to b
-    for i in out.keys():
-        b += (i - 25) * out[i]
-
-    #negate and divide by distance from x = 25
-    b /= -1200
-    #get reaction force at a via sum(F_x) = 0
-    a = -sum(out.values()) - b
-
-    #add two reaction forces to output dictionary
-    if (25 in out):
-        out[25] += a
-    else:
-        out[25] = a
-
-    if (1225 in out):
-        out[1225] += b
-    else:
-        out[1225] = b
+    #add all loads applied by train
+    for x, load in zip((pos + offsets).tolist(), loads.tolist()):
+        if not (0 < x < beam.length): continue
+        out[x] = out.get(x, 0) - load
+
+    #add reaction forces at the supports (superposition of the reactions of every load)
+    reactions = -numpy.array(list(out.values())) @ beam.reactions(list(out.keys()))
+    for support, r in zip(beam.supports.tolist(), reactions.tolist()):
+        out[support] = out.get(support, 0) + r
     return out
 
-#gives an array of force magnitudes (positive up, negative down), for every millimetre along the length of the bridge
+#gives an array of force magnitudes (positive up, negative down), for every station along the length of the bridge
 #takes in dictionary of forces at locations
-def sfd(forces):
-    out = []
-    value = 0
-
-    for i in range(1251):
-        if i in forces:
-            value += forces[i]
-        out.append(value)
-
-    return out
+def sfd(forces, beam=None):
+    if beam is None: beam = bridge
+    return Diagram(forces, beam.length).shear_at(beam.stations)
 
 #creates BMD using position
 #first generates SFD at location
 #then takes integral (sum) of SFD to produce BMD
-def bmd(pos):
-    d = find_reactions(pos)
-    forces = sfd(d)
-    out = []
+def bmd(pos, load_case=None, offsets=None, beam=None):
+    return bmd_matrix([pos], load_case, offsets, beam)[0]
 
-    for i in range(1251):
-        out.append(numpy.sum(forces[:i]))
-    
-    return out
+#train positions used to generate envelopes
+#from when front wheels enter, to when back wheels leave
+def train_positions(offsets=None, beam=None):
+    if offsets is None: offsets = spacing
+    if beam is None: beam = bridge
+    return numpy.arange(-max(offsets), beam.length + 1 - min(offsets), sample_frequency)
+
+#SFD and BMD for every train position at once, as a tuple of matrices (positions x stations)
+#superposition of the influence lines: each axle adds its load times the influence line at its position
+#axles between stations get their influence line computed directly instead of looked up
+def train_diagrams(positions, load_case=None, offsets=None, beam=None):
+    if beam is None: beam = bridge
+    offsets, loads = train(load_case, offsets)
+    x = numpy.asarray(positions)[:, None] + offsets[None, :]
+    rows = beam.station_index(x)
+    shear, moment = beam.influence_lines()
+
+    sfds = numpy.zeros((len(x), len(beam.stations)))
+    bmds = numpy.zeros((len(x), len(beam.stations)))
+    for k in range(len(loads)):
+        if rows is None:
+            sfds += loads[k] * beam.shear_influence(x[:, k, None], beam.stations)
+            bmds += loads[k] * beam.moment_influence(x[:, k, None], beam.stations)
+        else:
+            sfds += loads[k] * shear[rows[:, k]]
+            bmds += loads[k] * moment[rows[:, k]]
+    return sfds, bmds
+
+#SFD for every train position at once (positions x stations)
+def sfd_matrix(positions, load_case=None, offsets=None, beam=None):
+    return train_diagrams(positions, load_case, offsets, beam)[0]
+
+#BMD for every train position at once (positions x stations)
+def bmd_matrix(positions, load_case=None, offsets=None, beam=None):
+    return train_diagrams(positions, load_case, offsets, beam)[1]
+
+#index of the last train position with the largest absolute value, for every station
+#the old position-by-position loops kept the later position on ties
+def last_abs_max(diagrams):
+    return len(diagrams) - 1 - numpy.argmax(numpy.abs(diagrams[::-1]), axis=0)
 
 #generates a BMD for every possible position of the train
 #from when front wheels enter, to when back wheels leave
-def BME():
-    env = bmd(0)
-    for i in range(0, 1251 + 856, sample_frequency):
-        bmdd = bmd(i)
-        #maxxes the two lists together, putting maximum value of two lists
-        env = [m if abs(m) > abs(e) else e for m, e in zip(env, bmdd)]
-    return env
+#keeps the value with the largest magnitude (with its sign) at every station
+def BME(beam=None):
+    bmds = bmd_matrix(train_positions(beam=beam), beam=beam)
+    idx = last_abs_max(bmds)
+    return bmds[idx, numpy.arange(bmds.shape[1])]
 
 #generates SFD for every possible position of train
 #returns absolute max of shear force, since direction is irrelevant in calculations
-def SFE():
-    env = sfd(find_reactions(0))
-    for i in range(0, 1251 + 856, sample_frequency):
-        sfdd = sfd(find_reactions(i))
-        env = [abs(m) if abs(m) > abs(e) else e for m, e, in zip(env, sfdd)]
-    
-    return env
+def SFE(beam=None):
+    sfds = sfd_matrix(train_positions(beam=beam), beam=beam)
+    idx = last_abs_max(sfds)
+    env = sfds[idx, numpy.arange(sfds.shape[1])]
+    #the sign is only dropped once a later position has been compared against the maximum
+    return numpy.where(idx == len(sfds) - 1, env, numpy.abs(env))
 
 #combines minimum and maximum SFE of BME together into one absolute maximum one
 def min_max(min, max, abss):
@@ -107,52 +220,238 @@ def min_max(min, max, abss):
 
 #returns tuple of lists (min_sfe, max_sfe)
 #both positive and negative included
-def min_max_sfe():
-    minout = sfd(find_reactions(0))
-    maxout = sfd(find_reactions(0))
-
-    for i in range(0, 1251 + 856, sample_frequency):
-        sfdd = sfd(find_reactions(i))
-
-        for i in range(len(minout)):
-            minout[i] = min(minout[i], sfdd[i])
-            maxout[i] = max(maxout[i], sfdd[i])
-
-    return minout, maxout
+def min_max_sfe(beam=None):
+    sfds = sfd_matrix(train_positions(beam=beam), beam=beam)
+    return sfds.min(axis=0), sfds.max(axis=0)
 
 #same as min_max sfe but for bme
-def min_max_bme():
-    minout = bmd(0)
-    maxout = bmd(0)
-    for i in range(0, 1251 + 856, sample_frequency):
-        bmdd = bmd(i)
-
-        for i in range(len(minout)):
-            minout[i] = min(minout[i], bmdd[i])
-            maxout[i] = max(maxout[i], bmdd[i])
+def min_max_bme(beam=None):
+    bmds = bmd_matrix(train_positions(beam=beam), beam=beam)
+    return bmds.min(axis=0), bmds.max(axis=0)
+
+#generates all six envelopes from a single sweep of the train
+#load case given as car weights (m1, m2, m3), defaults to the load case above
+#or as one load per axle for any other train, together with its axle offsets
+#returns tuple of arrays (env, gov), both (stations x 6) with columns as in envelope_labels:
+#env holds the envelope values (same as min_max_sfe, min_max_bme and min_max)
+#gov holds the train position that governs each value
+#analytic = True only evaluates the critical train positions of every station (see critical_envelopes)
+def envelopes(load_case=None, offsets=None, analytic=False, beam=None):
+    if analytic: return critical_envelopes(load_case, offsets, beam)
+
+    positions = train_positions(offsets, beam)
+    sfds, bmds = train_diagrams(positions, load_case, offsets, beam)
+    return fold_envelopes(sfds, bmds, positions[:, None])
+
+#reduces candidate SFDs and BMDs (candidates x stations) to the six envelope columns
+#positions gives the train position of every candidate, broadcast against the diagrams
+#on ties the first candidate wins, so candidates should be in increasing train position
+def fold_envelopes(sfds, bmds, positions):
+    stations = numpy.arange(sfds.shape[1])
+    positions = numpy.broadcast_to(positions, sfds.shape)
+
+    env = numpy.empty((sfds.shape[1], 6))
+    gov = numpy.empty((sfds.shape[1], 6), dtype=positions.dtype)
+
+    for col, diagrams, abss in ((0, sfds, True), (3, bmds, False)):
+        lo = numpy.argmin(diagrams, axis=0)
+        hi = numpy.argmax(diagrams, axis=0)
+        mins = diagrams[lo, stations]
+        maxs = diagrams[hi, stations]
+
+        #absolute envelope picks whichever of min and max is larger in magnitude, as min_max does
+        use_min = numpy.abs(mins) > numpy.abs(maxs)
+        env[:, col] = mins
+        env[:, col + 1] = maxs
+        env[:, col + 2] = numpy.where(use_min, numpy.abs(mins) if abss else mins, numpy.abs(maxs))
+        gov[:, col] = positions[lo, stations]
+        gov[:, col + 1] = positions[hi, stations]
+        gov[:, col + 2] = numpy.where(use_min, gov[:, col], gov[:, col + 1])
+
+    return env, gov
+
+#same envelopes as the full sweep, but only evaluating the train positions that can govern
+#each influence line is linear in the load position, except:
+#  - under the station itself (moment has a kink at x = s, shear jumps just past x = s)
+#  - where an axle comes onto or goes off the bridge (x = 0 and x = length)
+#so the extremes at station s happen with the sweep positions on either side of a wheel being under s,
+#or on either side of a wheel reaching an end of the bridge; the latter are shared by every station
+def critical_envelopes(load_case=None, offsets=None, beam=None):
+    if beam is None: beam = bridge
+    if beam.indeterminate:
+        raise ValueError("critical positions assume straight-line reactions, sweep continuous beams instead")
+    axles, loads = train(load_case, offsets)
+    positions = train_positions(offsets, beam)
+    stations = beam.stations
+
+    #positions with a wheel at an end of the bridge, evaluated as full diagrams
+    ends = numpy.concatenate([around(positions, -axles, "right"), around(positions, beam.length - axles, "left")])
+    ends = numpy.unique(ends)
+    end_sfds, end_bmds = train_diagrams(ends, load_case, offsets, beam)
+
+    #positions with a wheel under the station, only evaluated at that station
+    under = around(positions, stations[:, None] - axles[None, :], "right").reshape(len(stations), -1)
+    x = under[:, :, None] + axles[None, None, :]
+    under_sfds = numpy.sum(loads * beam.shear_influence(x, stations[:, None, None]), axis=2)
+    under_bmds = numpy.sum(loads * beam.moment_influence(x, stations[:, None, None]), axis=2)
+
+    #merge both sets of candidates (stations x candidates) in increasing train position,
+    #so ties go to the earliest position like the sweep
+    cand = numpy.concatenate([numpy.broadcast_to(ends, (len(stations), len(ends))), under], axis=1)
+    order = numpy.argsort(cand, axis=1, kind="stable")
+    cand = numpy.take_along_axis(cand, order, axis=1)
+    sfds = numpy.take_along_axis(numpy.concatenate([end_sfds.T, under_sfds], axis=1), order, axis=1)
+    bmds = numpy.take_along_axis(numpy.concatenate([end_bmds.T, under_bmds], axis=1), order, axis=1)
+
+    return fold_envelopes(sfds.T, bmds.T, cand.T)
+
+#the two sweep positions on either side of every p, as array (p..., 2)
+#side = "right": last position <= p and the next one, side = "left": last position < p and the next one
+def around(positions, p, side):
+    i = numpy.searchsorted(positions, p, side=side)
+    last = len(positions) - 1
+    return numpy.stack([positions[numpy.clip(i - 1, 0, last)], positions[numpy.clip(i, 0, last)]], axis=-1)
+
+#absolute maximum moment anywhere on the bridge, using the resultant / midspan rule
+#the moment under a given wheel is quadratic in the train position between the positions where a wheel
+#comes onto or goes off the bridge, or the wheel crosses a support (and constant outside the supports)
+#its peak is where midspan lies halfway between that wheel and the resultant of the loads on the bridge
+#so only those positions, and the breakpoints themselves, are checked
+#returns tuple (moment, station, train position)
+def absolute_max_moment(load_case=None, offsets=None, beam=None):
+    if beam is None: beam = bridge
+    if beam.indeterminate:
+        raise ValueError("the resultant / midspan rule only holds for two supports")
+    axles, loads = train(load_case, offsets)
+    positions = train_positions(offsets, beam)
+    a, b = beam.supports[0], beam.supports[-1]
+    best = (0.0, 0.0, positions[0].item())
+
+    for k in range(len(axles)):
+        breaks = numpy.unique(numpy.concatenate([-axles, beam.length - axles, [a - axles[k], b - axles[k]]]))
+        cand = [breaks]
+
+        for lo, hi in zip(breaks[:-1], breaks[1:]):
+            on = beam.on_bridge((lo + hi) / 2 + axles)
+            if not on.any(): continue
+            r = numpy.sum(loads[on] * axles[on]) / numpy.sum(loads[on])
+            pos = (a + b - axles[k] - r) / 2
+            if lo < pos < hi: cand.append([pos])
+
+        #only sweep positions are used, so check the ones on both sides of every candidate
+        cand = numpy.concatenate(cand)
+        p = numpy.unique(numpy.concatenate([around(positions, cand, "right"), around(positions, cand, "left")]))
+        stations = numpy.clip(p + axles[k], 0, beam.length)
+        m = numpy.sum(loads * beam.moment_influence(p[:, None] + axles, stations[:, None]), axis=1)
+
+        i = numpy.argmax(m)
+        if m[i] > best[0]: best = (float(m[i]), float(stations[i]), p[i].item())
+
+    return best
+
+#content hash of everything an envelope depends on:
+#axle loads and offsets, the beam, sample frequency and how it was computed
+def cache_key(load_case=None, offsets=None, analytic=False, beam=None):
+    if beam is None: beam = bridge
+    axles, loads = train(load_case, offsets)
+    key = {
+        "version" : cache_version,
+        "loads" : loads.tolist(),
+        "offsets" : axles.tolist(),
+        "beam" : beam.key(),
+        "sample_frequency" : sample_frequency,
+        "analytic" : bool(analytic),
+    }
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+#same as envelopes(), but saved to disk the first time and memory-mapped (read-only) afterwards
+#a changed load case, train, beam or sample frequency gives a new key, so stale results are never read
+def cached_envelopes(load_case=None, offsets=None, analytic=False, beam=None):
+    key = cache_key(load_case, offsets, analytic, beam)
+    paths = [os.path.join(cache_folder, key + "_" + name + ".npy") for name in ("env", "gov")]
+
+    if all(os.path.exists(p) for p in paths):
+        return tuple(numpy.load(p, mmap_mode="r") for p in paths)
+
+    out = envelopes(load_case, offsets, analytic, beam)
+    for path, array in zip(paths, out):
+        Files.write_atomic(path, lambda f, array=array: numpy.save(f, array))
+    return out
 
-    return minout, maxout
+#compact SFD / BMD of one train position, stored only at the points where forces act (axles and supports)
+#shear is constant and moment is linear between breakpoints, so both can be evaluated at any x,
+#including fractions of a millimetre, and agree with sfd / bmd at every whole millimetre
+class Diagram:
+    #takes in dictionary of forces at locations, as returned by find_reactions
+    def __init__(self, forces, length=None):
+        if length is None: length = bridge.length
+        self.x = numpy.array(sorted(forces), dtype=float)
+        self.length = length
+
+        #shear just after every breakpoint, and moment at every breakpoint
+        self.shear = numpy.cumsum([forces[x] for x in sorted(forces)])
+        self.moment = numpy.zeros(len(self.x))
+        numpy.cumsum(self.shear[:-1] * numpy.diff(self.x), out=self.moment[1:])
+
+    #index of the last breakpoint at or before x (-1 before the first one)
+    def segment(self, x):
+        return numpy.searchsorted(self.x, x, side="right") - 1
+
+    #shear force at x (forces at x included, as in sfd)
+    def shear_at(self, x):
+        i = self.segment(x)
+        return numpy.where(i >= 0, self.shear[numpy.maximum(i, 0)], 0.0)
+
+    #bending moment at x
+    def moment_at(self, x):
+        i = numpy.maximum(self.segment(x), 0)
+        return numpy.where(x >= self.x[0], self.moment[i] + self.shear[i] * (x - self.x[i]), 0.0)
+
+    #returns tuple (min shear, max shear, min moment, max moment) over the whole bridge
+    #shear only changes at breakpoints and moment is linear between them, so only breakpoints (and the ends) are checked
+    def extremes(self):
+        shear = numpy.append(self.shear, 0.0)
+        moment = numpy.append(self.moment, [0.0, self.moment_at(self.length)])
+        return shear.min(), shear.max(), moment.min(), moment.max()
+
+    #returns tuple (location, moment) of the largest moment magnitude
+    def peak_moment(self):
+        i = numpy.argmax(numpy.abs(self.moment))
+        return self.x[i], self.moment[i]
+
+    #returns tuple (location, shear) of the largest shear magnitude, taken just after the breakpoint
+    def peak_shear(self):
+        i = numpy.argmax(numpy.abs(self.shear))
+        return self.x[i], self.shear[i]
+
+#breakpoint diagram of the train at a given position
+def diagram(pos, load_case=None, offsets=None, beam=None):
+    if beam is None: beam = bridge
+    return Diagram(find_reactions(pos, load_case, offsets, beam), beam.length)
+
+#extremes of every train position from its breakpoints, in O(axles) per position instead of O(stations)
+#returns array (positions x 4) of (min shear, max shear, min moment, max moment)
+def diagram_extremes(load_case=None, offsets=None, beam=None):
+    return numpy.array([diagram(p, load_case, offsets, beam).extremes() for p in train_positions(offsets, beam).tolist()])
 
 #combines all SFEs and BMEs into one list of strings to be plotted
-def combine(MIN_SFD, MAX_SFD, ENV_SFD, MIN_BMD, MAX_BMD, ENV_BMD):
+#first column is the station position (mm), taken as the index when no stations are given
+def combine(MIN_SFD, MAX_SFD, ENV_SFD, MIN_BMD, MAX_BMD, ENV_BMD, stations=None):
     out = []
     for i in range(len(ENV_SFD)):
-        out.append(str(i) + "," + str(MIN_SFD[i]) + "," + str(MAX_SFD[i]) + "," + str(ENV_SFD[i]) + "," + str(MIN_BMD[i]) + "," + str(MAX_BMD[i]) + "," + str(ENV_BMD[i]))
+        out.append(str(i if stations is None else stations[i]) + "," + str(MIN_SFD[i]) + "," + str(MAX_SFD[i]) + "," + str(ENV_SFD[i]) + "," + str(MIN_BMD[i]) + "," + str(MAX_BMD[i]) + "," + str(ENV_BMD[i]))
     return out
 
 
 if __name__ == "__main__":
-    MIN_SFD, MAX_SFD = min_max_sfe()
-    MIN_BMD, MAX_BMD = min_max_bme()
-
-    ENV_BMD = min_max(MIN_BMD, MAX_BMD, False)
-    ENV_SFD = min_max(MIN_SFD, MAX_SFD, True)
+    ENV, GOV = envelopes()
+    MIN_SFD, MAX_SFD, ENV_SFD, MIN_BMD, MAX_BMD, ENV_BMD = ENV.T.tolist()
 
     print("Maximum SFE: ", max(ENV_SFD))
     print("Maximum BME: ", max(ENV_BMD))
 
     L = combine(MIN_SFD, MAX_SFD, ENV_SFD, MIN_BMD, MAX_BMD, ENV_BMD)
-    L.insert(0, "POSITION (mm),MIN SFE (N),MAX SFE (N),SFE (N),MIN BME (N mm),MAX BME (N mm),BME (N mm)")
+    L.insert(0, ",".join(["POSITION (mm)"] + envelope_labels))
 
     del L[1], L[-1]
 
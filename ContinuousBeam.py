@@ -0,0 +1,158 @@
+import numpy
+import BMD
+import CrossSection
+
+#beam over any number of supports (statically indeterminate), solved with the stiffness method
+#the beam is split into Euler-Bernoulli elements, two DOFs per node (w, theta)
+#reactions come from the Muller-Breslau principle: the influence line of a support reaction is the
+#deflected shape of the beam when that support alone is pushed up by 1 mm
+#so the whole thing is one banded factorization, solved for one right-hand side per support,
+#after which every train position goes through the same influence-line superposition as Beam
+
+#with no loads between nodes, the cubic shape functions give the exact deflected shape of an element of constant EI
+#so nodes are only needed at the ends, the supports and wherever EI changes
+#(fewer, longer elements are also much better conditioned than one per station)
+
+#half-bandwidth of the stiffness matrix: an element couples the 4 DOFs of its two nodes
+bandwidth = 3
+
+class ContinuousBeam(BMD.Beam):
+    indeterminate = True
+
+    #EI (N mm^2) can be a constant, one value per element, or a function of x (evaluated at element midpoints)
+    #a constant EI does not change the reactions, so it defaults to 1
+    def __init__(self, length=1250, supports=(25, 625, 1225), resolution=1, EI=1):
+        BMD.Beam.__init__(self, length, supports, resolution)
+
+        nodes = self.station_index(self.supports)
+        if nodes is None:
+            raise ValueError("supports must be at stations, got " + str(self.supports.tolist()))
+
+        #EI of the segment between every pair of consecutive stations
+        mid = (self.stations[:-1] + self.stations[1:]) / 2
+        self.EI = numpy.broadcast_to(EI(mid) if callable(EI) else numpy.asarray(EI, dtype=float), mid.shape).copy()
+
+        #nodes (as station indices) at the ends, the supports and every change of EI
+        changes = numpy.nonzero(self.EI[1:] != self.EI[:-1])[0] + 1
+        self.nodes = numpy.unique(numpy.concatenate([[0, len(self.stations) - 1], nodes, changes]))
+        self.x = self.stations[self.nodes]
+
+        #vertical DOF of every support is fixed, every other DOF is free
+        self.fixed = 2 * numpy.searchsorted(self.nodes, nodes)
+        self.free = numpy.setdiff1d(numpy.arange(2 * len(self.nodes)), self.fixed)
+
+        band = stiffness_band(self.EI[self.nodes[:-1]], numpy.diff(self.x))
+        self.factor = cholesky_band(restrict_band(band, self.free))
+
+        #support j pushed up by 1 mm: the free DOFs carry the reaction of the fixed one, K_ff u = -K_fj
+        rhs = numpy.zeros((len(self.free), len(self.fixed)))
+        for j, dof in enumerate(self.fixed):
+            rhs[:, j] = -band_column(band, dof)[self.free]
+
+        shapes = numpy.zeros((2 * len(self.nodes), len(self.fixed)))
+        shapes[self.free] = self.solve(rhs)
+        shapes[self.fixed, numpy.arange(len(self.fixed))] = 1
+
+        #deflection and slope of every node, for every support (nodes x supports)
+        self.w = shapes[0::2]
+        self.theta = shapes[1::2]
+
+    def key(self):
+        out = BMD.Beam.key(self)
+        out["EI"] = self.EI.tolist()
+        return out
+
+    #solves K u = rhs for the free DOFs, any number of right-hand sides at once (free DOFs x cases)
+    def solve(self, rhs):
+        return solve_band(self.factor, rhs)
+
+    #reaction at every support caused by a 1 N downward load at x, as array (x..., supports)
+    #deflected shapes interpolated inside the elements with the cubic (Hermite) shape functions
+    def reactions(self, x):
+        x = numpy.asarray(x, dtype=float)
+        e = numpy.clip(numpy.searchsorted(self.x, x, side="right") - 1, 0, len(self.x) - 2)
+        h = self.x[e + 1] - self.x[e]
+        t = (x - self.x[e]) / h
+
+        n1 = 1 - 3 * t ** 2 + 2 * t ** 3
+        n2 = h * (t - 2 * t ** 2 + t ** 3)
+        n3 = 3 * t ** 2 - 2 * t ** 3
+        n4 = h * (t ** 3 - t ** 2)
+
+        out = (n1[..., None] * self.w[e] + n2[..., None] * self.theta[e]
+               + n3[..., None] * self.w[e + 1] + n4[..., None] * self.theta[e + 1])
+        return out * self.on_bridge(x)[..., None]
+
+#EI along the bridge from the three cross-sections, using the zones in CrossSection.cross_section_at_pos
+#(or from a CrossSection.SectionSchedule given as supports, edge and middle left out)
+#I of each zone is only computed once
+#returns a function of x, to be passed as the EI of a ContinuousBeam
+def section_EI(supports, edge=None, middle=None, E=4000):
+    schedule = supports if isinstance(supports, CrossSection.SectionSchedule) else CrossSection.zone_schedule(supports, edge, middle)
+    EI = numpy.array([E * section.I for section in schedule.sections])
+    return lambda x: EI[schedule.indices(x)]
+
+#global stiffness matrix in banded form: band[i, d] = K[i, i + d], for d = 0 .. bandwidth
+#takes in EI and length h of every element
+def stiffness_band(EI, h):
+    one = numpy.ones(len(h))
+    k = numpy.array([
+        [12 * one, 6 * h, -12 * one, 6 * h],
+        [6 * h, 4 * h ** 2, -6 * h, 2 * h ** 2],
+        [-12 * one, -6 * h, 12 * one, -6 * h],
+        [6 * h, 2 * h ** 2, -6 * h, 4 * h ** 2],
+    ]) / h ** 3
+
+    band = numpy.zeros((2 * (len(EI) + 1), bandwidth + 1))
+    first = 2 * numpy.arange(len(EI))
+    for r in range(4):
+        for c in range(r, 4):
+            numpy.add.at(band, (first + r, c - r), EI * k[r, c])
+    return band
+
+#column j of the full (symmetric) matrix stored in band
+def band_column(band, j):
+    out = numpy.zeros(len(band))
+    for d in range(bandwidth + 1):
+        if j - d >= 0: out[j - d] = band[j - d, d]
+        if j + d < len(band): out[j + d] = band[j, d]
+    return out
+
+#band of the matrix keeping only the rows / columns in keep (sorted)
+#dropping DOFs only brings the others closer together, so the bandwidth is unchanged
+def restrict_band(band, keep):
+    out = numpy.zeros((len(keep), bandwidth + 1))
+    for d in range(bandwidth + 1):
+        i = numpy.arange(len(keep) - d)
+        gap = keep[i + d] - keep[i]
+        ok = gap <= bandwidth
+        out[i[ok], d] = band[keep[i[ok]], gap[ok]]
+    return out
+
+#Cholesky factor U (K = U^T U) of a symmetric positive definite banded matrix, same storage as the band
+def cholesky_band(band):
+    n = len(band)
+    U = numpy.zeros(band.shape)
+    for i in range(n):
+        k = numpy.arange(max(0, i - bandwidth), i)
+        above = U[k, i - k]
+        U[i, 0] = numpy.sqrt(band[i, 0] - numpy.dot(above, above))
+        for d in range(1, min(bandwidth, n - 1 - i) + 1):
+            j = i + d
+            k = numpy.arange(max(0, j - bandwidth), i)
+            U[i, d] = (band[i, d] - numpy.dot(U[k, i - k], U[k, j - k])) / U[i, 0]
+    return U
+
+#solves U^T U x = rhs with the factor from cholesky_band, for every column of rhs at once
+def solve_band(U, rhs):
+    n = len(U)
+    y = numpy.array(rhs, dtype=float)
+    for i in range(n):
+        for d in range(1, min(bandwidth, i) + 1):
+            y[i] -= U[i - d, d] * y[i - d]
+        y[i] /= U[i, 0]
+    for i in range(n - 1, -1, -1):
+        for d in range(1, min(bandwidth, n - 1 - i) + 1):
+            y[i] -= U[i, d] * y[i + d]
+        y[i] /= U[i, 0]
+    return y
@@ -1,32 +1,600 @@
-import ast
+import bisect
+import hashlib
+import json
+import os
+import re
+import numpy
+import warnings
+import Files
+import Geometry
 #shapes defined by a list of vertices
 
 #overall function giving an array of rectangles in a text file
+#(any format load understands)
 def get_rects(file_name):
-    file = load_file(file_name)
+    return load(file_name)["rects"].tolist()
+
+#cross-section as a contiguous (n x 4) array of rectangles [x, y, w, h] (central coordinates, as everywhere else)
+#derived properties are computed on first use and kept until the rectangles change
+#iterating gives the rectangles as lists, so a Section can be passed anywhere a list of rectangles is expected
+#exact = True takes area, ybar and I from the union of the rectangles (overlaps counted once) instead of their sum
+#editing single rectangles (append, section[i] = rect, del section[i]) is incremental: the running sums of
+#A, Ay, Ay^2 and own I (about the first rectangle's y, so far-away sections keep their precision) give ybar and I in O(1),
+#and the Q / b profile is only updated in the height band of the rectangles that changed
+#tabs are explicit glue tabs (g x 2 x 2 end points, as load reads them), see glue_joints
+class Section:
+    def __init__(self, rects=(), exact=None, tabs=None):
+        if isinstance(rects, Section):
+            if exact is None: exact = rects.exact
+            if tabs is None: tabs = rects.tabs
+            rects = rects.rects
+        self.exact = bool(exact)
+        self.tabs = numpy.reshape(numpy.asarray(() if tabs is None else tabs, dtype=float), (-1, 2, 2))
+        self.set_rects(rects)
+
+    #replaces all rectangles
+    def set_rects(self, rects):
+        self.rects = numpy.array(rects, dtype=float).reshape(-1, 4)
+        #read-only, so every change goes through the methods below and clears the cache
+        self.rects.flags.writeable = False
+        self.origin = self.rects[0, 1] if len(self.rects) else 0.0
+        self.sums = kernel_sums(self.rects, self.origin)
+        self.cache = {}
+
+    #new rectangles after removing and adding a few: sums and profile updated instead of recomputed
+    def change(self, rects, removed, added):
+        removed = numpy.reshape(removed, (-1, 4))
+        added = numpy.reshape(added, (-1, 4))
+        self.rects = rects
+        self.rects.flags.writeable = False
+        sign = numpy.repeat([-1.0, 1.0], [len(removed), len(added)])
+        self.sums = self.sums + rect_sums(numpy.vstack([removed, added]), self.origin, sign)
+
+        profile = self.cache.get("profile")
+        self.cache = {}
+        #the union isn't a sum, and a profile with many leftover edges is cheaper to rebuild
+        if profile is None or self.exact or len(profile.edges) > 4 * len(rects) + 8: return
+        profile.update(removed, added)
+        profile.follow(self)
+        self.cache["profile"] = profile
+
+    def append(self, rect):
+        self.change(numpy.vstack([self.rects, numpy.reshape(rect, (1, 4))]), [], rect)
+
+    def extend(self, rects):
+        self.change(numpy.vstack([self.rects, numpy.reshape(rects, (-1, 4))]), [], rects)
+
+    def __setitem__(self, i, rect):
+        rects = self.rects.copy()
+        rects[i] = rect
+        self.change(rects, self.rects[i], rects[i])
+
+    def __delitem__(self, i):
+        self.change(numpy.delete(self.rects, i, axis=0), self.rects[i], [])
+
+    def __len__(self):
+        return len(self.rects)
+
+    def __iter__(self):
+        return iter(self.rects.tolist())
+
+    def __getitem__(self, i):
+        return self.rects[i].tolist()
+
+    #value of fn(self), computed once per set of rectangles
+    def cached(self, name, fn):
+        if name not in self.cache: self.cache[name] = fn(self)
+        return self.cache[name]
+
+    @property
+    def area(self):
+        if self.exact: return self.union["area"]
+        return self.sums[0]
+
+    #centroid-axis of cross-section
+    @property
+    def ybar(self):
+        if self.exact: return self.union["ybar"]
+        #empty section: 0, like Geometry.combine
+        if self.sums[0] == 0: return 0.0
+        return self.origin + self.sums[1] / self.sums[0]
+
+    @property
+    def I(self):
+        if self.exact: return self.union["I"]
+        A, Ay, Ayy, own = self.sums
+        if A == 0: return 0.0
+        return own + Ayy - Ay ** 2 / A
+
+    #area, ybar and I of the material actually there (union of the rectangles), see union_properties
+    @property
+    def union(self):
+        return self.cached("union", lambda s: union_properties(s.rects))
+
+    #area covered by more than one rectangle (counted twice by the plain sums)
+    @property
+    def overlap(self):
+        return self.union["overlap"]
+
+    #(left, bottom, right, top) of the whole cross-section
+    @property
+    def bounds(self):
+        def compute(s):
+            x, y, w, h = s.rects.T
+            return ((x - w / 2).min(), (y - h / 2).min(), (x + w / 2).max(), (y + h / 2).max())
+        return self.cached("bounds", compute)
+
+    #distance from centroid to top of cross-section
+    @property
+    def y_top(self):
+        return self.cached("y_top", lambda s: s.bounds[3] - s.ybar)
+
+    #distance from bottom of cross-section to centroid
+    @property
+    def y_bot(self):
+        return self.cached("y_bot", lambda s: s.ybar - s.bounds[1])
+
+    #RectIndex of the rectangles, for overlap queries
+    @property
+    def index(self):
+        return self.cached("index", lambda s: RectIndex(s))
+
+    #Q(y), b(y) over the whole depth, see ShearProfile
+    @property
+    def profile(self):
+        return self.cached("profile", ShearProfile)
+
+    #heights and contact widths of the horizontal glue joints, see glue_joints
+    @property
+    def glue(self):
+        return self.cached("glue", lambda s: glue_joints(s.rects, s.tabs))
+
+#sums of A, Ay, Ay^2 and own I (wh^3 / 12) of rectangles, with y measured from origin
+#sign (one per rectangle) is -1 for rectangles being taken away
+def rect_sums(rects, origin=0.0, sign=1.0):
+    x, y, w, h = numpy.reshape(rects, (-1, 4)).T
+    A = w * h * sign
+    y = y - origin
+    return numpy.array([A.sum(), A @ y, (A * y) @ y, (A * h) @ h / 12])
+
+#the same sums for a whole section, from the shared geometry kernel (Geometry.polygon_moments)
+#used when all the rectangles are set at once, single-rectangle edits add and take away rect_sums
+def kernel_sums(rects, origin=0.0):
+    m = Geometry.polygon_moments(Geometry.rect_polygons(rects))
+    A, y = m["A"], m["cy"] - origin
+    return numpy.array([A.sum(), A @ y, (A * y) @ y, m["Ixx"].sum()])
+
+#array a with value v inserted before index k (numpy.insert does the same, with a lot more overhead)
+def splice(a, k, v):
+    return numpy.concatenate((a[:k], [v], a[k:]))
+
+#Q(y) and b(y) of a cross-section at every height, as piecewise functions between the rectangle edges
+#b is constant between two consecutive edges, so Q (integral of (ybar - t) b dt from the bottom up to y)
+#is a parabola in each interval, highest where the interval is closest to the centroid
+#so the height where Q / b (and VQ / Ib) is worst is known exactly from one candidate per interval
+#the area and first moment below every edge don't depend on ybar, so a rectangle added or removed (update)
+#only changes them in its own height band (and by a constant above it)
+class ShearProfile:
+    def __init__(self, section):
+        if not isinstance(section, Section): section = Section(section)
+        x, y, w, h = section.rects.T
+
+        #heights where b can change, and b in each interval (edges[k], edges[k + 1]]
+        self.edges = numpy.unique(numpy.concatenate([y - h / 2, y + h / 2]))
+        if section.exact:
+            self.widths = slab_widths(section.rects, self.edges)
+        else:
+            delta = numpy.zeros(len(self.edges))
+            numpy.add.at(delta, numpy.searchsorted(self.edges, y - h / 2), w)
+            numpy.add.at(delta, numpy.searchsorted(self.edges, y + h / 2), -w)
+            self.widths = numpy.cumsum(delta)[:-1]
+            self.round_off(0, len(self.widths))
+
+        #area and first moment (about y = 0) of everything below every edge
+        self.A_edges = numpy.zeros(len(self.edges))
+        self.Ay_edges = numpy.zeros(len(self.edges))
+        if len(self.edges): self.integrate(0, len(self.widths))
+        self.follow(section)
+
+    #takes ybar and I of the section (again, after it changed)
+    def follow(self, section):
+        self.ybar = section.ybar
+        self.I = section.I
+        #Q at every edge, 0 at the bottom and (up to round-off) at the top
+        self.Q_edges = self.ybar * self.A_edges - self.Ay_edges
+
+    #gaps come out of running sums as round-off, not exactly 0
+    def round_off(self, k1, k2):
+        band = self.widths[k1:k2]
+        band[numpy.abs(band) < 1e-9 * max(1, numpy.abs(self.widths).max(initial=0))] = 0
+
+    #A_edges and Ay_edges above edge k1 after widths[k1:k2] changed: integrated over the band, shifted above it
+    def integrate(self, k1, k2):
+        y1, y2 = self.edges[k1:k2], self.edges[k1 + 1:k2 + 1]
+        before = self.A_edges[k2], self.Ay_edges[k2]
+        self.A_edges[k1 + 1:k2 + 1] = self.A_edges[k1] + numpy.cumsum(self.widths[k1:k2] * (y2 - y1))
+        self.Ay_edges[k1 + 1:k2 + 1] = self.Ay_edges[k1] + numpy.cumsum(self.widths[k1:k2] * (y2 ** 2 - y1 ** 2) / 2)
+        self.A_edges[k2 + 1:] += self.A_edges[k2] - before[0]
+        self.Ay_edges[k2 + 1:] += self.Ay_edges[k2] - before[1]
+
+    #index of edge at height e, splitting the interval it falls in if it isn't an edge yet
+    #(both halves keep its width, the new edge gets the area and first moment below it)
+    def split(self, e):
+        k = int(numpy.searchsorted(self.edges, e))
+        if k < len(self.edges) and self.edges[k] == e: return k
+
+        if len(self.edges) == 0:
+            A = Ay = 0.0
+        elif k == 0 or k == len(self.edges):
+            #new empty interval below or above everything
+            self.widths = splice(self.widths, min(k, len(self.widths)), 0.0)
+            A, Ay = self.A_edges[min(k, len(self.edges) - 1)], self.Ay_edges[min(k, len(self.edges) - 1)]
+        else:
+            b, y1 = self.widths[k - 1], self.edges[k - 1]
+            self.widths = splice(self.widths, k, b)
+            A = self.A_edges[k - 1] + b * (e - y1)
+            Ay = self.Ay_edges[k - 1] + b * (e * e - y1 * y1) / 2
+        self.edges = splice(self.edges, k, e)
+        self.A_edges = splice(self.A_edges, k, A)
+        self.Ay_edges = splice(self.Ay_edges, k, Ay)
+        return k
+
+    #takes away rectangles removed and adds rectangles added, ybar and I are left to follow
+    #widths, area and first moment are only recomputed between the lowest and highest edge of those rectangles
+    #(edges of removed rectangles stay, with the same width on both sides they change nothing)
+    def update(self, removed, added):
+        changed = [(-1, r) for r in numpy.reshape(removed, (-1, 4)).tolist()] + [(1, r) for r in numpy.reshape(added, (-1, 4)).tolist()]
+        if not changed: return
+        for sign, (x, y, w, h) in changed:
+            self.split(y - h / 2)
+            self.split(y + h / 2)
+
+        #only once every edge is in, as splitting moves the edges above
+        bands = numpy.searchsorted(self.edges, [[y - h / 2, y + h / 2] for sign, (x, y, w, h) in changed])
+        for (sign, r), (low, high) in zip(changed, bands.tolist()):
+            self.widths[low:high] += sign * r[2]
+        k1, k2 = bands[:, 0].min(), bands[:, 1].max()
+        self.round_off(k1, k2)
+        self.integrate(k1, k2)
+
+    #index of the interval (edges[k], edges[k + 1]] containing y, -1 or len(widths) if outside the section
+    def interval(self, y):
+        return numpy.searchsorted(self.edges, y, side="left") - 1
+
+    #width of cross-section at height y, same convention as width_at_location
+    def b(self, y):
+        k = self.interval(y)
+        inside = (k >= 0) & (k < len(self.widths))
+        return numpy.where(inside, self.widths[numpy.clip(k, 0, len(self.widths) - 1)], 0.0)
+
+    #first moment of area about the centroid of everything below (or above) height y
+    def Q(self, y):
+        k = numpy.clip(self.interval(y), 0, len(self.widths) - 1)
+        y = numpy.clip(y, self.edges[0], self.edges[-1])
+        return self.Q_edges[k] - self.widths[k] / 2 * ((y - self.ybar) ** 2 - (self.edges[k] - self.ybar) ** 2)
+
+    #shear stress VQ / Ib at height y (0 where there is no material)
+    def stress(self, y, V):
+        b = self.b(y)
+        return numpy.where(b > 0, V * self.Q(y) / (self.I * numpy.where(b > 0, b, 1)), 0.0)
+
+    #height where Q / b is largest, ignoring gaps (b = 0)
+    #returns tuple (height, Q, b)
+    def critical(self):
+        heights = numpy.clip(self.ybar, self.edges[:-1], self.edges[1:])
+        k = numpy.arange(len(self.widths))
+        Q = self.Q_edges[k] - self.widths / 2 * ((heights - self.ybar) ** 2 - (self.edges[:-1] - self.ybar) ** 2)
+        ratio = numpy.where(self.widths > 0, Q / numpy.where(self.widths > 0, self.widths, 1), -numpy.inf)
+        i = numpy.argmax(ratio)
+        return heights[i], Q[i], self.widths[i]
+
+#two edges closer than this (mm) touch (TXT files give mm to 2 decimals, the rest is round-off from the centre / size form)
+contact_tolerance = 1e-6
+
+#horizontal glue joints: heights where the top of one rectangle touches the bottom of another, and the total contact width there
+#vertical contacts (the side of one rectangle against another) aren't joints here, so a web glued to the side of a tab
+#isn't checked, and a web standing on a flange is glued along its edge only
+#all top and bottom edges go in one list sorted by height, then position, so every joint is a run of equal heights
+#whose top and bottom intervals are intersected in a single pass (O(n log n) overall)
+#tabs (g x 2 x 2 end points of explicit glue tabs, from a SHAPES: / GLUE_TABS: file) replace the contact found at their height
+#returns tuple of arrays (heights, widths), sorted by height
+def glue_joints(rects, tabs=()):
+    x, y, w, h = numpy.reshape(rects, (-1, 4)).T
+    edges = numpy.concatenate([y + h / 2, y - h / 2])
+    keys = numpy.round(edges / contact_tolerance)
+    side = numpy.repeat([0, 1], len(x))
+    left = numpy.concatenate([x - w / 2, x - w / 2])
+    right = numpy.concatenate([x + w / 2, x + w / 2])
+    order = numpy.lexsort((left, side, keys))
+
+    joints = {}
+    starts = numpy.flatnonzero(numpy.diff(keys[order], prepend=numpy.nan) != 0).tolist() + [len(order)]
+    for a, b in zip(starts[:-1], starts[1:]):
+        run = order[a:b]
+        tops = merge_intervals(left[run][side[run] == 0], right[run][side[run] == 0])
+        bottoms = merge_intervals(left[run][side[run] == 1], right[run][side[run] == 1])
+        width = contact_width(tops, bottoms)
+        if width > contact_tolerance: joints[keys[run[0]]] = (edges[run[0]], width)
+
+    tabs = numpy.reshape(numpy.asarray(tabs, dtype=float), (-1, 2, 2))
+    tab_joints = {}
+    for (x1, y1), (x2, y2) in tabs.tolist():
+        height, width = tab_joints.get(round(y1 / contact_tolerance), (y1, 0.0))
+        tab_joints[round(y1 / contact_tolerance)] = (height, width + abs(x2 - x1))
+    joints.update(tab_joints)
+
+    out = sorted(joints.values())
+    return numpy.array([j[0] for j in out]), numpy.array([j[1] for j in out])
+
+#sorted (by left end) intervals merged where they touch or overlap, as a list of (left, right)
+def merge_intervals(left, right):
+    out = []
+    for l, r in zip(left.tolist(), right.tolist()):
+        if out and l <= out[-1][1] + contact_tolerance: out[-1][1] = max(out[-1][1], r)
+        else: out.append([l, r])
+    return out
 
-    rects = []
+#total length where two lists of sorted, disjoint intervals overlap
+def contact_width(a, b):
+    out = 0.0
+    i = j = 0
+    while i < len(a) and j < len(b):
+        out += max(0.0, min(a[i][1], b[j][1]) - max(a[i][0], b[j][0]))
+        if a[i][1] < b[j][1]: i += 1
+        else: j += 1
+    return out
 
-    for i in file:
-        rects.append(convert_to_rect(i))
-    
-    return rects
+#glue joint of a section where Q / b is largest (VQ / Ib is worst)
+#returns tuple (height, Q, b), (None, 0, 0) if nothing is glued
+def glue_critical(section):
+    if not isinstance(section, Section): section = Section(section)
+    heights, widths = section.glue
+    if len(heights) == 0: return None, 0.0, 0.0
+    Q = numpy.abs(section.profile.Q(heights))
+    i = numpy.argmax(Q / widths)
+    return heights[i], Q[i], widths[i]
+
+#Q(y) / b(y) profile of a list of rectangles (or Section)
+def shear_profile(rects):
+    return Section(rects).profile if not isinstance(rects, Section) else rects.profile
+
+#list of sections (lists of rectangles, arrays or Sections) with different numbers of rectangles
+#as one (sections x rects x 4) array, shorter sections padded with empty rectangles
+#returns tuple (rects, mask), mask (sections x rects) is True for the real rectangles
+def pad_sections(sections):
+    sections = [numpy.reshape(numpy.asarray(s.rects if isinstance(s, Section) else s, dtype=float), (-1, 4)) for s in sections]
+    longest = max([len(s) for s in sections], default=0)
+    rects = numpy.zeros((len(sections), longest, 4))
+    mask = numpy.zeros((len(sections), longest), dtype=bool)
+    for i, s in enumerate(sections):
+        rects[i, :len(s)] = s
+        mask[i, :len(s)] = True
+    return rects, mask
+
+#ybar, I, y_top, y_bot, Q_centroid and b_centroid of many cross-sections at once
+#rects is (sections x rects x 4) (see pad_sections), mask (sections x rects) leaves out the padding (None: every rectangle is real)
+#same sums as ybar, I, ybar_top, ybar_bot, Q(rects, ybar, ybar) and width_at_location(rects, ybar),
+#each done for every section in one array operation
+#returns dictionary of arrays, one value per section
+def batch_properties(rects, mask=None):
+    rects = numpy.asarray(rects, dtype=float)
+    rects = rects.reshape((-1,) + rects.shape[-2:])
+    if mask is None: mask = numpy.ones(rects.shape[:2], dtype=bool)
+    x, y, w, h = numpy.moveaxis(rects, -1, 0)
+    bottom, top = y - h / 2, y + h / 2
+
+    A = numpy.where(mask, w * h, 0)
+    ybar = (A * y).sum(axis=1) / A.sum(axis=1)
+    centroid = ybar[:, None]
+    I = numpy.where(mask, w * h ** 3 / 12 + A * (y - centroid) ** 2, 0).sum(axis=1)
+
+    #part of every rectangle below the centroid, and its distance to the centroid
+    below = numpy.clip(numpy.minimum(top, centroid) - bottom, 0, None)
+    Q = numpy.where(mask, w * below * (centroid - bottom - below / 2), 0).sum(axis=1)
+
+    return {
+        "ybar" : ybar,
+        "I" : I,
+        "y_top" : numpy.where(mask, top, -numpy.inf).max(axis=1) - ybar,
+        "y_bot" : ybar - numpy.where(mask, bottom, numpy.inf).min(axis=1),
+        "Q_centroid" : Q,
+        "b_centroid" : numpy.where(mask & (bottom < centroid) & (centroid <= top), w, 0).sum(axis=1),
+    }
+
+#width of the union of the rectangles (overlaps counted once) in each slab (edges[k], edges[k + 1])
+#for every slab at once: the x-intervals of the rectangles crossing it, sorted, each adding only what
+#sticks out past the furthest end so far
+def slab_widths(rects, edges):
+    rects = numpy.reshape(rects, (-1, 4))
+    x, y, w, h = rects.T
+    mid = (edges[:-1] + edges[1:])[:, None] / 2
+
+    #rectangles not crossing a slab become empty intervals at the far left
+    crossing = (y - h / 2 < mid) & (mid < y + h / 2)
+    left = (x - w / 2).min(initial=0)
+    starts = numpy.where(crossing, x - w / 2, left)
+    ends = numpy.where(crossing, x + w / 2, left)
+
+    order = numpy.argsort(starts, axis=1)
+    starts = numpy.take_along_axis(starts, order, axis=1)
+    ends = numpy.take_along_axis(ends, order, axis=1)
+    reach = numpy.concatenate([numpy.full((len(mid), 1), -numpy.inf), numpy.maximum.accumulate(ends, axis=1)[:, :-1]], axis=1)
+    return numpy.clip(ends - numpy.maximum(starts, reach), 0, None).sum(axis=1)
+
+#exact area, ybar and I of the union of the rectangles, by slicing the section into slabs at every top / bottom edge
+#(the union has constant width in each slab), plus the area that the plain sums count more than once
+#returns dictionary with area, ybar, I, overlap
+def union_properties(rects):
+    rects = numpy.reshape(rects, (-1, 4))
+    x, y, w, h = rects.T
+    edges = numpy.unique(numpy.concatenate([y - h / 2, y + h / 2]))
+    widths = slab_widths(rects, edges)
+    y1, y2 = edges[:-1], edges[1:]
+
+    area = numpy.sum(widths * (y2 - y1))
+    ybar = numpy.sum(widths * (y2 ** 2 - y1 ** 2) / 2) / area
+    I = numpy.sum(widths * ((y2 - ybar) ** 3 - (y1 - ybar) ** 3) / 3)
+
+    return {
+        "area" : area,
+        "ybar" : ybar,
+        "I" : I,
+        "overlap" : numpy.sum(w * h) - area,
+    }
+
+#area, centroid and second moments of shapes exported by the GUI (rotated rectangles, circles, polygons),
+#which a Section (axis-aligned rectangles only) can't represent
+#returns dictionary with A, cx, cy, Ixx, Iyy, Ixy (about the centroid), so ybar = cy and I = Ixx
+def shape_properties(shapes):
+    return Geometry.combine(Geometry.shape_moments(shapes))
+
+#Section of the rectangles (and glue tabs, if the file has any) in a section file
+#warns if rectangles overlap (the plain sums count that area twice, exact = True doesn't)
+def get_section(file_name, exact=False):
+    data = load(file_name)
+    section = Section(data["rects"], exact, data["glue"])
+    if section.overlap > 1e-6 * section.union["area"]:
+        warnings.warn("%s: rectangles overlap, %g mm^2 counted twice unless exact=True" % (file_name, section.overlap))
+    return section
+
+#parsed section files are kept here, named by a hash of the file contents (bump loader_version when parsing changes)
+section_cache_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "section_cache")
+loader_version = 2
+
+#any number in a line of text (ints, decimals, exponents)
+number = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+#loads a cross-section file in any of the formats we have, and turns every shape into rectangles:
+#TXT: one vertex list per line, [(x, y), ...]
+#GUI JSON (gui.py export): list of shape dictionaries
+#SHAPES: / GLUE_TABS: (CrossSection_GUI_BACKUP_ORIGIN.py export): "name: [(x, y), ...]" and "id: ((x, y), (x, y))" lines
+#the result is cached by file contents, so loading the same section again only reads and hashes the file
+#returns dictionary with rects (n x 4 array [x, y, w, h]) and glue (g x 2 x 2 array, end points of every glue tab)
+def load(file_name):
+    with open(file_name, "rb") as f:
+        data = f.read()
+    key = hashlib.sha1(str(loader_version).encode() + b"\0" + data).hexdigest()
+    path = os.path.join(section_cache_folder, key + ".bin")
+
+    #cached file is raw float64: number of rectangles, number of glue tabs, then both arrays flattened
+    if os.path.exists(path):
+        flat = numpy.fromfile(path)
+        n, g = int(flat[0]), int(flat[1])
+        return {"rects" : flat[2:2 + 4 * n].reshape(n, 4), "glue" : flat[2 + 4 * n:].reshape(g, 2, 2)}
+
+    polygons, glue = parse_section(data.decode())
+    out = {
+        "rects" : numpy.array([r for p in polygons for r in polygon_rects(p)], dtype=float).reshape(-1, 4),
+        "glue" : numpy.array(glue, dtype=float).reshape(-1, 2, 2),
+    }
+
+    flat = numpy.concatenate([[len(out["rects"]), len(out["glue"])], out["rects"].ravel(), out["glue"].ravel()])
+    Files.write_atomic(path, flat.tofile)
+    return out
 
 #load a file given path filename
 #return as list
 #each index of returned list holds list of tuples representing corners of rectangle
 def load_file(filename):
-    all_polygons = []
-
     with open(filename, "r") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue  # skip empty lines
-            polygon = ast.literal_eval(line)  # safely convert string to list of tuples
-            all_polygons.append(polygon)
-    
-    return all_polygons
+        return parse_section(f.read())[0]
+
+#list of (x, y) pairs in a piece of text, no eval needed
+def parse_points(text):
+    values = [float(v) for v in number.findall(text)]
+    return list(zip(values[0::2], values[1::2]))
+
+#tuple (polygons, glue tabs) in the text of a section file, whichever format it is
+def parse_section(text):
+    start = text.lstrip()[:1]
+    if start == "{" or start == "[":
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            data = None #TXT lines also start with [
+        #a one-line TXT file ([[0, 0], [10, 0], ...]) is valid JSON too, only shape dictionaries make a GUI export
+        if isinstance(data, dict) or (isinstance(data, list) and all(isinstance(d, dict) for d in data)):
+            return json_polygons(data), []
+
+    if "SHAPES:" in text:
+        return parse_shapes(text)
+
+    return [parse_points(line) for line in text.splitlines() if line.strip()], []
+
+#"SHAPES:", "COMPOSITES:" and "GLUE_TABS:" blocks, every line "name: points"
+def parse_shapes(text):
+    polygons = []
+    glue = []
+    block = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line: continue
+        if line.endswith(":") and line[:-1].isupper():
+            block = line[:-1]
+            continue
+        points = parse_points(line.partition(":")[2])
+        if block == "SHAPES": polygons.append(points)
+        elif block == "GLUE_TABS": glue.append(points)
+    return polygons, glue
+
+#vertex lists of the shapes exported by gui.py (rectangle 'pos' is the bottom-left corner)
+#only shapes that are made of axis-aligned rectangles can be analysed, anything else should go through shape_properties
+def json_polygons(shapes):
+    if not isinstance(shapes, list) or not all(isinstance(d, dict) for d in shapes):
+        raise ValueError("JSON section files are lists of shapes")
+    out = []
+    for d in shapes:
+        t = d.get("type")
+        if t == "rectangle":
+            if d.get("rotation", 0) % 90 != 0:
+                raise ValueError("rectangle '%s' is rotated by %g degrees, use shape_properties" % (d.get("name"), d["rotation"]))
+            w, h = d.get("w", 0), d.get("h", 0)
+            corners = numpy.array([(0, 0), (w, 0), (w, h), (0, h)], dtype=float) + d.get("pos", (0, 0))
+            corners = Geometry.rotate(corners, d.get("rotation", 0), d.get("pos", (0, 0)))
+            #rotating by 90 degrees leaves round-off in the corners
+            out.append([tuple(p) for p in numpy.round(corners, 9).tolist()])
+        elif t == "polygon":
+            out.append([tuple(p) for p in d.get("points", [])])
+        elif t == "circle":
+            raise ValueError("circle '%s' can't be made of rectangles, use shape_properties" % d.get("name"))
+    return out
+
+#rectangles [x, y, w, h] making up a polygon
+#a polygon with only horizontal and vertical edges (L, T, U shapes...) is cut into vertical strips, not horizontal slabs:
+#glue_joints takes every horizontal contact between two rectangles for a glue joint, so the seam between two slabs
+#of one shape would be checked as glue, while the vertical seams between strips are never looked at
+#anything else is replaced by its bounding box (like convert_to_rect)
+def polygon_rects(verts):
+    n = len(verts)
+    edges = [(verts[i], verts[(i + 1) % n]) for i in range(n)]
+    if n < 4 or not all(a[0] == b[0] or a[1] == b[1] for a, b in edges):
+        return [convert_to_rect(verts)]
+
+    #horizontal edges as (y, left, right)
+    horizontal = [(a[1], min(a[0], b[0]), max(a[0], b[0])) for a, b in edges if a[1] == b[1] and a[0] != b[0]]
+    xs = sorted(set(v[0] for v in verts))
+
+    #open[(bottom, top)] = left side of the rectangle still growing to the right with that interval
+    out = []
+    open = {}
+    for x1, x2 in zip(xs[:-1], xs[1:]):
+        mid = (x1 + x2) / 2
+        ys = sorted(y for y, left, right in horizontal if left < mid < right)
+        intervals = set(zip(ys[0::2], ys[1::2]))
+
+        for interval in list(open):
+            if interval not in intervals:
+                out.append(strip_rect(interval, open.pop(interval), x1))
+        for interval in intervals:
+            open.setdefault(interval, x1)
+
+    out.extend(strip_rect(interval, left, xs[-1]) for interval, left in open.items())
+    return sorted(out, key=lambda r: (r[1], r[0]))
+
+#rectangle [x, y, w, h] spanning interval (bottom, top) from left to right
+def strip_rect(interval, left, right):
+    bottom, top = interval
+    return [(right + left) / 2, (top + bottom) / 2, right - left, top - bottom]
 
 #takes list of 4 tuples representing 4 corners of a rectangles
 #converts to list of 4 numbers, representing [x, y, w, h]
@@ -36,9 +604,6 @@ def convert_to_rect(verts):
     xs = [a[0] for a in verts]
     ys = [a[1] for a in verts]
 
-    print(xs)
-    print(ys)
-
     x = (max(xs) + min(xs)) / 2
     y = (max(ys) + min(ys)) / 2
 
@@ -49,6 +614,7 @@ def convert_to_rect(verts):
 
 #gets centroid-axis of cross-section
 def ybar(rects):
+    if isinstance(rects, Section): return rects.ybar
 
     ybar = 0
     area = 0
@@ -61,6 +627,7 @@ def ybar(rects):
 
 #gets I of cross-section
 def I(rects):
+    if isinstance(rects, Section): return rects.I
     YBAR = ybar(rects)
 
     Iout = 0
@@ -193,6 +760,93 @@ def cleave(a, b_list):
 
     return pieces
 
+#index over a list of rectangles, answering "which rects overlap this box" by bisection instead of a scan
+#each rectangle is kept in a list sorted along its short side (thin webs by x, thin flanges / strips by y),
+#so only rectangles starting within one plate thickness (the longest short side in that list) of the box are checked
+class RectIndex:
+    #below this many rectangles a plain scan is faster than bisecting
+    small = 16
+
+    def __init__(self, rects):
+        self.rects = list(rects)
+        self.lists = []
+        if len(self.rects) <= RectIndex.small: return
+
+        for axis in (0, 1):
+            #rectangles no wider than tall go in the x list, the rest in the y list
+            members = [i for i, r in enumerate(self.rects) if (r[2] <= r[3]) == (axis == 0)]
+            if not members: continue
+            members.sort(key=lambda i: self.rects[i][axis] - self.rects[i][axis + 2] / 2)
+            starts = [self.rects[i][axis] - self.rects[i][axis + 2] / 2 for i in members]
+            longest = max([self.rects[i][axis + 2] for i in members])
+            self.lists.append((axis, members, starts, longest))
+
+    #indices of rectangles that could overlap box (superset, found by bisection)
+    def candidates(self, box):
+        if not self.lists: return range(len(self.rects))
+        out = []
+        for axis, members, starts, longest in self.lists:
+            b1, b2 = box[axis] - box[axis + 2] / 2, box[axis] + box[axis + 2] / 2
+            out += members[bisect.bisect_right(starts, b1 - longest) : bisect.bisect_left(starts, b2)]
+        return out
+
+    #rectangles overlapping box (same test as intersects), in the order they were given
+    def overlapping(self, box):
+        return [self.rects[i] for i in sorted(self.candidates(box)) if intersects(box, self.rects[i])]
+
+    #whether any rectangle overlaps box, same as int_list(box, rects)
+    def any(self, box):
+        for i in self.candidates(box):
+            if intersects(box, self.rects[i]): return True
+        return False
+
+#cleaves every rectangle in rects by the cut planes (make_taller / make_wider output, or a RectIndex of them) in one sweep
+#axis = 0: planes cut along x (vertical planes, from make_taller), pieces of each rectangle left to right
+#axis = 1: planes cut along y (horizontal planes, from make_wider), pieces of each rectangle top to bottom
+#(the same pieces in the same order as cleave, which is what plate_buckling relies on, minus cleave's round-off slivers)
+#returns the combined list of pieces of all rectangles
+def split_all(rects, planes, axis=0):
+    other = 1 - axis
+    if not isinstance(planes, RectIndex): planes = RectIndex(planes)
+
+    out = []
+    for a in rects:
+        a1, a2 = a[axis] - a[axis + 2] / 2, a[axis] + a[axis + 2] / 2
+        b1, b2 = a[other] - a[other + 2] / 2, a[other] + a[other + 2] / 2
+
+        #planes overlapping the rectangle, in the order they start along axis
+        cutters = sorted(planes.overlapping(a), key=lambda p: p[axis] - p[axis + 2] / 2)
+        if not cutters:
+            out.append(a)
+            continue
+
+        #a plane that doesn't span the rectangle along the other axis also leaves pieces above / below it,
+        #so those rectangles go through cleave
+        if any(p[other] - p[other + 2] / 2 > b1 or p[other] + p[other + 2] / 2 < b2 for p in cutters):
+            out.extend(cleave(a, cutters))
+            continue
+
+        #otherwise each plane just removes its interval along axis: keep the gaps between the (merged) intervals
+        pieces = []
+        left = a1
+        for p in cutters:
+            start, end = p[axis] - p[axis + 2] / 2, p[axis] + p[axis + 2] / 2
+            if start > left:
+                pieces.append(piece_of(a, axis, left, start))
+            left = max(left, end)
+        if left < a2:
+            pieces.append(piece_of(a, axis, left, a2))
+
+        out.extend(pieces if axis == 0 else pieces[::-1])
+    return out
+
+#part of rectangle a between p1 and p2 along axis
+def piece_of(a, axis, p1, p2):
+    piece = list(a)
+    piece[axis] = (p1 + p2) / 2
+    piece[axis + 2] = p2 - p1
+    return piece
+
 #gives Q (first moment of area) of the cross section (rects) at a given height (height)
 def Q(rects, height, ybar):
 
@@ -221,25 +875,104 @@ def width_at_location(rects, height):
 
     return out
 
+#cross-sections along the bridge: a sorted list of zones, each holding one Section (or any other value, e.g. a name)
+#zones is a list of (start, section) or (start, section, taper_to), sorted by start (mm)
+#a zone runs from its start up to the start of the next one, the first zone also covers everything before it
+#and the last everything after it
+#taper_to: the section changes linearly from section (at start) to taper_to (at the next zone's start),
+#a tapering zone is cut into pieces of at most taper_step mm, each with the interpolated section at its middle
+#every piece is a Section of its own, so properties are computed once per zone (or piece), not per station,
+#and a station is found by bisection whatever the number of zones
+class SectionSchedule:
+    def __init__(self, zones, taper_step=25):
+        zones = list(zones)
+        self.starts = []
+        self.sections = []
+        #the same cross-section in several zones becomes one Section, so its cache is shared
+        converted = {}
+
+        for k, zone in enumerate(zones):
+            start, section = float(zone[0]), zone_section(zone[1], converted)
+            if k > 0 and start < self.starts[-1]:
+                raise ValueError("zones must be sorted by start: %g after %g" % (start, self.starts[-1]))
+            if len(zone) < 3 or zone[2] is None:
+                self.starts.append(start)
+                self.sections.append(section)
+                continue
+
+            if k + 1 == len(zones):
+                raise ValueError("tapering zone at %g mm has no zone after it to end at" % start)
+            end = float(zones[k + 1][0])
+            taper_to = zone_section(zone[2], converted)
+            pieces = max(1, int(numpy.ceil((end - start) / taper_step)))
+            for j in range(pieces):
+                self.starts.append(start + (end - start) * j / pieces)
+                self.sections.append(interpolate(section, taper_to, (j + 0.5) / pieces))
+
+    def __len__(self):
+        return len(self.sections)
+
+    #index of the zone (or tapering piece) at pos
+    def index(self, pos):
+        return max(bisect.bisect_right(self.starts, pos) - 1, 0)
+
+    #zone index of every position in an array
+    def indices(self, positions):
+        return numpy.maximum(numpy.searchsorted(self.starts, positions, side="right") - 1, 0)
+
+    #cross-section at pos
+    def at(self, pos):
+        return self.sections[self.index(pos)]
+
+    #each distinct cross-section once, with the zone indices it is used in (in order of first use)
+    def groups(self):
+        out = {}
+        for n, section in enumerate(self.sections):
+            out.setdefault(id(section), (section, []))[1].append(n)
+        return list(out.values())
+
+#section of a schedule zone: names (strings) are kept as they are, anything else becomes a Section (once per object)
+def zone_section(section, converted):
+    if isinstance(section, str): return section
+    if id(section) not in converted:
+        converted[id(section)] = (section, section if isinstance(section, Section) else Section(section))
+    return converted[id(section)][1]
+
+#Section part way (fraction f) from a to b: every rectangle (and glue tab) moved and resized linearly
+#a and b need the same number of rectangles, in corresponding order
+def interpolate(a, b, f):
+    if len(a.rects) != len(b.rects):
+        raise ValueError("can't taper between sections of %d and %d rectangles" % (len(a.rects), len(b.rects)))
+    tabs = a.tabs * (1 - f) + b.tabs * f if len(a.tabs) == len(b.tabs) else (a.tabs if f < 0.5 else b.tabs)
+    return Section(a.rects * (1 - f) + b.rects * f, a.exact, tabs)
+
+#schedule of the three cross-sections of the bridge (support, edge, middle) in their zones:
+#support up to 125 mm, edge from 125, middle from 510 up to and including 810,
+#edge after 810 up to and including 1125, support after that
+#(zones start inclusive, so the two that start just after 810 and 1125 start at the next float)
+def zone_schedule(supports="support", edge="edge", middle="middle"):
+    after = lambda x: float(numpy.nextafter(x, numpy.inf))
+    return SectionSchedule([(0, supports), (125, edge), (510, middle), (after(810), edge), (after(1125), supports)])
+
+#names of the zones along the bridge
+zone_names = zone_schedule()
+
 #since varying cross-section across length of bridge, used to specify cross-section type at specific location on bridge
+#returns "support", "edge" or "middle"
 def cross_section_at_pos(pos):
-    # support, edge, middle
-    spac = [125, 510, 810, 1125]
-    if (spac[1] <= pos <= spac[2]):
-        return "middle"
-    if spac[0] <= pos < spac[1] or spac[2] < pos <= spac[3]:
-        return "edge"
-    return "support"
+    return zone_names.at(pos)
 
 #ybar relative to very bottom of cross-section
 #to find ybar relative
 def ybar_bot(rects):
+    if isinstance(rects, Section): return rects.y_bot
     YBAR = ybar(rects)
 
     return YBAR - min([a[1] - a[3] / 2 for a in rects])
 
 #distance from centroid to top of cross-section
 def ybar_top(rects):
+    if isinstance(rects, Section): return rects.y_top
     YBAR = ybar(rects)
     return max([a[1] + a[3] / 2 for a in rects]) - YBAR
 
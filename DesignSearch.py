@@ -0,0 +1,156 @@
+import numpy
+import BMD
+import CrossSection
+import SharedPool
+import optimize
+
+#searches a family of box girders for the design with the highest minimum FOS (over every station and failure mode)
+#that can be cut out of one sheet of matboard
+#the loads are linear in the train weight, so the failure load is min FOS x train weight,
+#and maximizing one maximizes the other
+#candidates are evaluated in a pool of processes, all reading the same envelope from shared memory (see SharedPool)
+
+#one sheet of matboard (mm^2) and its thickness (mm)
+matboard_area = 813 * 1016
+thickness = 1.27
+
+#every parameter of the box girder: (lowest, highest, whole number)
+#web_height --> height of the webs between the flanges (mm)
+#top_width, bottom_width --> flange widths (mm), the webs stand on the edges of the bottom flange
+#top_layers, bottom_layers --> number of matboard layers glued together in each flange
+#tab_width --> glue tabs folded inwards from the top of each web, under the top flange (mm)
+#diaphragms --> number of diaphragms spread evenly between the pairs at the supports
+parameters = {
+    "web_height" : (40, 200, False),
+    "top_width" : (60, 150, False),
+    "bottom_width" : (40, 120, False),
+    "top_layers" : (1, 4, True),
+    "bottom_layers" : (1, 3, True),
+    "tab_width" : (0, 20, False),
+    "diaphragms" : (0, 12, True),
+}
+
+#roughly design 6, where the search starts
+start = {
+    "web_height" : 96.19,
+    "top_width" : 100,
+    "bottom_width" : 80,
+    "top_layers" : 1,
+    "bottom_layers" : 1,
+    "tab_width" : 10,
+    "diaphragms" : 2,
+}
+
+#diaphragms always placed in pairs around the supports, 0 and 1250 are needed by the code but aren't built
+support_diaphragms = [20, 30, 1220, 1230]
+
+#design (parameters) clipped to the allowed ranges, whole numbers rounded, and tabs / top flange made to fit the webs
+def clean(design):
+    out = {}
+    for name, (low, high, whole) in parameters.items():
+        value = min(max(design.get(name, start[name]), low), high)
+        out[name] = int(round(value)) if whole else float(value)
+    out["top_width"] = max(out["top_width"], out["bottom_width"])
+    out["tab_width"] = min(out["tab_width"], out["bottom_width"] / 2 - 2 * thickness)
+    return out
+
+#cross-section of a design: Section of rectangles [x, y, w, h] centred on x = 0, bottom at y = 0
+#laminated flanges are one rectangle (they buckle as one plate), their glue layers are given as explicit glue tabs
+def box_girder(design):
+    t = thickness
+    wb, wt = design["bottom_width"], design["top_width"]
+    bottom = design["bottom_layers"] * t
+    top = bottom + design["web_height"]
+    flange = design["top_layers"] * t
+
+    rects = [
+        [0, bottom / 2, wb, bottom],
+        [-(wb - t) / 2, bottom + design["web_height"] / 2, t, design["web_height"]],
+        [(wb - t) / 2, bottom + design["web_height"] / 2, t, design["web_height"]],
+        [0, top + flange / 2, wt, flange],
+    ]
+    tab = design["tab_width"]
+    if tab > 0:
+        rects.append([-(wb / 2 - t - tab / 2), top - t / 2, tab, t])
+        rects.append([wb / 2 - t - tab / 2, top - t / 2, tab, t])
+
+    #glue between the layers of each flange
+    tabs = [((-wb / 2, k * t), (wb / 2, k * t)) for k in range(1, design["bottom_layers"])]
+    tabs += [((-wt / 2, top + k * t), (wt / 2, top + k * t)) for k in range(1, design["top_layers"])]
+    return CrossSection.Section(rects, tabs=tabs)
+
+#diaphragm positions of a design (as optimize.diaphragm_spacing)
+def diaphragm_positions(design, length=1250):
+    inside = numpy.linspace(support_diaphragms[1], support_diaphragms[2], design["diaphragms"] + 2)[1:-1]
+    return [0] + support_diaphragms[:2] + inside.tolist() + support_diaphragms[2:] + [length]
+
+#matboard used by a design (mm^2): every rectangle is its area / thickness wide and runs the length of the bridge,
+#every diaphragm fills the inside of the box
+def matboard_used(design, length=1250):
+    section = box_girder(design)
+    inside = (design["bottom_width"] - 2 * thickness) * design["web_height"]
+    return section.area / thickness * length + (len(support_diaphragms) + design["diaphragms"]) * inside
+
+#min FOS of a design under the envelopes, with the failure mode and station where it happens
+#SFD_ENV and BMD_ENV at every mm, as optimize.FOS_whole_bridge (position 0 left out, as there)
+#returns dictionary with fos, mode, position, matboard
+def evaluate(design, SFD_ENV, BMD_ENV):
+    section = box_girder(design)
+    fos, labels = optimize.FOS_array(SFD_ENV, BMD_ENV, section, section, section, diaphragm_positions(design))
+    station, mode = numpy.unravel_index(numpy.argmin(fos[1:]), fos[1:].shape)
+    return {
+        "fos" : float(fos[1:][station, mode]),
+        "mode" : labels[mode],
+        "position" : int(station) + 1,
+        "matboard" : float(matboard_used(design)),
+    }
+
+#evaluates one design against the shared envelopes (SFE, BME columns)
+def evaluate_job(design):
+    env = SharedPool.worker["arrays"][0]
+    return evaluate(design, env[:, 0], env[:, 1])
+
+#random design within the parameter ranges
+def random_design(rng):
+    return clean({name : rng.integers(low, high + 1) if whole else rng.uniform(low, high) for name, (low, high, whole) in parameters.items()})
+
+#design moved by a random step in every parameter, scale = step size as a fraction of each range
+def perturb(design, rng, scale):
+    out = {}
+    for name, (low, high, whole) in parameters.items():
+        out[name] = design[name] + rng.normal(0, scale * (high - low))
+    return clean(out)
+
+#random search followed by rounds of local search around the best designs found so far (step halved every round)
+#only designs within the matboard budget are evaluated
+#load_case as BMD.envelopes, samples = designs evaluated per round, keep = how many of the best designs are searched around
+#returns list of tuples (design, result of evaluate), best first
+def search(samples=200, rounds=4, keep=8, processes=None, seed=0, load_case=None, budget=matboard_area):
+    rng = numpy.random.default_rng(seed)
+    ENV, GOV = BMD.cached_envelopes(load_case, analytic=True)
+    env = numpy.ascontiguousarray(ENV[:1250][:, [2, 5]])
+
+    with SharedPool.SharedArrays([env]) as shared:
+        results = []
+        candidates = [clean(start)] + [random_design(rng) for _ in range(samples)]
+        scale = 0.1
+
+        with SharedPool.pool(processes, shared) as pool:
+            for _ in range(rounds + 1):
+                candidates = [d for d in candidates if matboard_used(d) <= budget]
+                results += zip(candidates, pool.map(evaluate_job, candidates))
+                results.sort(key=lambda r: r[1]["fos"], reverse=True)
+
+                best = [d for d, r in results[:keep]]
+                candidates = [perturb(best[i % len(best)], rng, scale) for i in range(samples)] if best else []
+                scale /= 2
+        return results
+
+if __name__ == "__main__":
+    results = search()
+    weight = BMD.axle_loads().sum()
+
+    for design, result in results[:5]:
+        print(design)
+        print("    min FOS %.4f (%s at %d mm), failure load %.0f N, matboard %.0f / %.0f mm^2" % (
+            result["fos"], result["mode"], result["position"], result["fos"] * weight, result["matboard"], matboard_area))
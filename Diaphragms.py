@@ -0,0 +1,123 @@
+import numpy
+import BMD
+import CrossSection
+import optimize
+
+#searches diaphragm counts and positions for the highest minimum FOS of a bridge
+#only case 4 plate buckling (shear buckling of the webs) depends on the diaphragms, through the spacing a of the panel
+#a station is in, so the worst case 4 FOS of a panel only depends on where its two diaphragms are:
+#it is computed once per panel and cached, and moving one diaphragm only re-evaluates the two panels next to it
+#every other failure mode is computed once, it is the same for every layout
+
+#diaphragms at the supports, kept in every layout (0 and 1250 are needed by the code but aren't built)
+fixed = [0, 20, 30, 1220, 1230, 1250]
+
+#positions (mm) a diaphragm is tried at, between its neighbours
+step = 5
+
+#worst case 4 FOS of every panel of a bridge (cross-sections and envelopes as optimize.FOS_whole_bridge,
+#a CrossSection.SectionSchedule can be given as supports)
+#stations 1 .. 1249 mm, as in the minima FOS_whole_bridge prints
+class PanelCapacity:
+    def __init__(self, SFD_ENV, BMD_ENV, supports, edge=None, middle=None, length=1250):
+        M = numpy.asarray(BMD_ENV[:length], dtype=float)
+        V = numpy.abs(numpy.asarray(SFD_ENV[:length], dtype=float))
+        self.positions = numpy.arange(length)
+        schedule = supports if isinstance(supports, CrossSection.SectionSchedule) else CrossSection.zone_schedule(supports, edge, middle)
+
+        #every mode except case 4 (doesn't depend on the diaphragms, any spacing will do)
+        fos, labels = optimize.FOS_array(SFD_ENV[:length], M, schedule)
+        self.labels = labels
+        self.other = fos[1:, :-1].min()
+
+        #case 4 FOS at a station = min over pieces of (alpha / a^2 + beta) / (VQ / I), see optimize.plate_fos_array
+        #alpha, beta of the pieces of every station's cross-section, and VQ / I of every station
+        k = 5 * numpy.pi ** 2 * optimize.E / 12 / (1 - optimize.mu ** 2)
+        zones = schedule.indices(self.positions)
+        self.zones = {}
+        self.zone = numpy.zeros(length, dtype=int)
+        self.load = numpy.zeros(length)
+        for n, (section, indices) in enumerate(schedule.groups()):
+            ybar, I = section.ybar, section.I
+            Q = CrossSection.Q(section, ybar, ybar)
+            t, h, b = section.cached(("plate_classes", ybar), lambda s: optimize.plate_classes(s, ybar))["shear"]
+            self.zones[n] = (k * t ** 2 * b, k * (t / h) ** 2 * b)
+            at = numpy.isin(zones, indices)
+            self.zone[at] = n
+            self.load[at] = V[at] * Q / I
+
+        self.cache = {}
+
+    #worst case 4 FOS of the stations in the panel (lo, hi], a = hi - lo (1e3 if nothing buckles), cached
+    def panel(self, lo, hi):
+        key = (lo, hi)
+        if key not in self.cache:
+            a = hi - lo
+            out = numpy.inf
+            stations = self.positions[max(int(numpy.floor(lo)) + 1, 1) : int(numpy.floor(hi)) + 1]
+            for n, (alpha, beta) in self.zones.items():
+                at = stations[self.zone[stations] == n]
+                load = self.load[at]
+                if len(alpha) == 0 or not (load > 0).any(): continue
+                capacity = (alpha / a ** 2 + beta).min()
+                out = min(out, capacity / load.max())
+            self.cache[key] = 1e3 if out == numpy.inf else out
+        return self.cache[key]
+
+    #worst case 4 FOS of every panel of a layout (sorted diaphragm positions, ends included)
+    def panels(self, layout):
+        return [self.panel(lo, hi) for lo, hi in zip(layout[:-1], layout[1:])]
+
+    #min FOS of the bridge (every mode) with diaphragms at layout
+    def fos(self, layout):
+        return min(self.other, min(self.panels(layout)))
+
+#best positions for a number of diaphragms between the fixed ones, by coordinate search:
+#each diaphragm in turn is moved to the best position between its neighbours (every 'step' mm),
+#which only changes the two panels it bounds, until no move helps
+#returns tuple (layout, min FOS)
+def place(capacity, count, passes=10):
+    lo, hi = fixed[2], fixed[3]
+    inside = [int(round(p)) for p in numpy.linspace(lo, hi, count + 2)[1:-1]]
+    layout = sorted(fixed + inside)
+    #the fixed diaphragms are the first and last three
+    movable = range(3, 3 + count)
+    scores = capacity.panels(layout)
+
+    for _ in range(passes):
+        moved = False
+        for i in movable:
+            #worst panel that doesn't touch diaphragm i
+            rest = min(scores[:i - 1] + scores[i + 1:], default=numpy.inf)
+            best, best_score = layout[i], min(scores[i - 1], scores[i])
+            for p in range(layout[i - 1] + step, layout[i + 1] - step + 1, step):
+                score = min(capacity.panel(layout[i - 1], p), capacity.panel(p, layout[i + 1]))
+                #a move has to raise the bridge's worst panel, or keep it and raise the worse of these two
+                if (min(score, rest), score) > (min(best_score, rest), best_score):
+                    best, best_score = p, score
+            if best != layout[i]:
+                layout[i] = best
+                scores[i - 1], scores[i] = capacity.panel(layout[i - 1], best), capacity.panel(best, layout[i + 1])
+                moved = True
+        if not moved: break
+
+    return layout, capacity.fos(layout)
+
+#best layout for every number of diaphragms in counts
+#returns list of tuples (count, layout, min FOS)
+def search(capacity, counts=range(0, 9)):
+    return [(count,) + place(capacity, count) for count in counts]
+
+if __name__ == "__main__":
+    supports = CrossSection.get_section("./Design Iterations/design6_supports.txt")
+    edge = CrossSection.get_section("./Design Iterations/design6_edge.txt")
+    middle = CrossSection.get_section("./Design Iterations/design6_middle.txt")
+    ENV, GOV = BMD.cached_envelopes(analytic=True)
+
+    capacity = PanelCapacity(ENV[:, 2], ENV[:, 5], supports, edge, middle)
+    #the min FOS may well be set by another mode, so the worst panel (case 4) is printed too
+    current = optimize.diaphragm_spacing
+    print("current layout: min FOS %.6f, case 4 %.6f, %s" % (capacity.fos(current), min(capacity.panels(current)), current))
+    for count, layout, fos in search(capacity):
+        print("%d diaphragms: min FOS %.6f, case 4 %.6f, %s" % (count, fos, min(capacity.panels(layout)), layout))
+    print(len(capacity.cache), "panels evaluated")
@@ -1,7 +1,36 @@
+import os
+import numpy
+import CrossSection
+import Geometry
+
 # code generates a list of lists of lists of tuples
+#(a cross-section is a list of rectangles, each a list of its corners (x, y), as in the section files)
 
-#generates a cross_section at position pos along the bridge
+folder = os.path.dirname(os.path.abspath(__file__))
+
+#corners are rounded to this many decimals, so x - w / 2 etc. come back as the section files have them
+#(1.27, not 1.269999999999996), tapered sections included; adding 0.0 turns -0.0 into 0.0
+decimals = 9
 
+#schedules used when none is given, loaded on first use
+schedules = {}
+
+#design 6 in the zones of CrossSection.cross_section_at_pos
+def default_schedule():
+    if "design6" not in schedules:
+        files = [os.path.join(folder, "Design Iterations", "design6_%s.txt" % k) for k in ("supports", "edge", "middle")]
+        schedules["design6"] = CrossSection.zone_schedule(*[CrossSection.get_section(f) for f in files])
+    return schedules["design6"]
+
+#generates a cross_section at position pos along the bridge
+#schedule = CrossSection.SectionSchedule to take it from, design 6 if not given
+#returns list of rectangles, each a list of 4 (x, y) tuples (bottom left, bottom right, top right, top left)
+def generate_cross_section(pos, schedule=None):
+    if schedule is None: schedule = default_schedule()
+    corners = numpy.round(Geometry.rect_polygons(schedule.at(pos).rects), decimals) + 0.0
+    return [[tuple(v) for v in rect] for rect in corners.tolist()]
 
-def generate_cross_section(pos):
-    pass
\ No newline at end of file
+#cross-sections at every position in a list
+def generate_cross_sections(positions, schedule=None):
+    if schedule is None: schedule = default_schedule()
+    return [generate_cross_section(pos, schedule) for pos in positions]
@@ -0,0 +1,17 @@
+import os
+
+#file helpers shared by the on-disk caches (BMD.cached_envelopes, CrossSection.load)
+
+#writes a file through write(f) (f open in binary mode), creating its folder if needed
+#everything goes to a temporary file first, which is then moved into place,
+#so a half-written file is never picked up (by another process, or after a crash)
+def write_atomic(path, write):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp = path + "." + str(os.getpid()) + ".tmp"
+    try:
+        with open(temp, "wb") as f:
+            write(f)
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.exists(temp): os.remove(temp)
+        raise
@@ -17,14 +17,13 @@ Run:
     python section_builder_pyqt6.py
 
 Notes:
-- Circles are approximated as polygons for inertia calculations.
+- Circles use exact formulas (Geometry.circle_moments) for inertia calculations.
 - This file targets PyQt6. If you want PyQt5 instead, ask and I'll rewrite.
 """
 
 
 import sys
 import json
-import math
 from functools import partial
 
 from PyQt6.QtWidgets import (
@@ -37,35 +36,7 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtGui import QPolygonF, QPen, QBrush, QColor, QTransform, QPainter, QAction
 from PyQt6.QtCore import Qt, QPointF, QEvent
 import numpy as np
-
-# ---------- Geometry utilities ----------
-
-def polygon_area_centroid_moments(points):
-    """Compute area, centroid (cx, cy), and second moments (Ixx, Iyy, Ixy) for a polygon.
-    Points: list of (x,y) tuples in order.
-    """
-    if len(points) < 3:
-        return 0.0, (0.0, 0.0), (0.0, 0.0, 0.0)
-    pts = np.array(points, dtype=float)
-    x = pts[:, 0]
-    y = pts[:, 1]
-    x2 = np.roll(x, -1)
-    y2 = np.roll(y, -1)
-    a = x * y2 - x2 * y
-    A = 0.5 * a.sum()
-    if abs(A) < 1e-9:
-        return 0.0, (0.0, 0.0), (0.0, 0.0, 0.0)
-    cx = (1.0 / (6.0 * A)) * ((x + x2) * a).sum()
-    cy = (1.0 / (6.0 * A)) * ((y + y2) * a).sum()
-    Ixx = (1.0 / 12.0) * ((y * y + y * y2 + y2 * y2) * a).sum()
-    Iyy = (1.0 / 12.0) * ((x * x + x * x2 + x2 * x2) * a).sum()
-    Ixy = (1.0 / 24.0) * ((x * y2 + 2 * x * y + 2 * x2 * y2 + x2 * y) * a).sum()
-    if A < 0:
-        A = -A
-        Ixx = -Ixx
-        Iyy = -Iyy
-        Ixy = -Ixy
-    return A, (cx, cy), (Ixx, Iyy, Ixy)
+import Geometry
 
 # ---------- Graphics items for shapes ----------
 
@@ -146,13 +117,9 @@ class CircleItem(QGraphicsEllipseItem, BaseShapeItem):
     def update_geometry(self):
         self.setRect(-self.r, -self.r, 2*self.r, 2*self.r)
 
-    def shape_polygon(self, n=64):
-        pts = []
-        for i in range(n):
-            theta = 2 * math.pi * i / n
-            p = self.mapToScene(QPointF(self.r * math.cos(theta), self.r * math.sin(theta)))
-            pts.append((p.x(), p.y()))
-        return pts
+    def centre(self):
+        p = self.mapToScene(QPointF(0, 0))
+        return (p.x(), p.y())
 
     def to_dict(self):
         d = BaseShapeItem.to_dict(self)
@@ -467,33 +434,24 @@ class SectionBuilderMain(QMainWindow):
             QMessageBox.information(self, 'Compute', 'Select a shape or shapes')
             return
         polys = []
+        circles = []
         for s in sel:
             if isinstance(s, RectangleItem):
                 polys.append(s.shape_polygon())
             elif isinstance(s, CircleItem):
-                polys.append(s.shape_polygon())
+                circles.append(s.centre() + (s.r,))
             elif isinstance(s, PolygonItem):
                 polys.append(s.to_point_list())
-        total_area = 0.0
-        cx_num = 0.0
-        cy_num = 0.0
-        Ixx_total = 0.0
-        Iyy_total = 0.0
-        Ixy_total = 0.0
-        for p in polys:
-            A, (cx, cy), (Ixx, Iyy, Ixy) = polygon_area_centroid_moments(p)
-            total_area += A
-            cx_num += A * cx
-            cy_num += A * cy
-            Ixx_total += Ixx + A * (cy**2)
-            Iyy_total += Iyy + A * (cx**2)
-            Ixy_total += Ixy + A * (cx * cy)
-        if total_area == 0:
+        # all shapes in one batch (circles exact), moments about the combined centroid
+        batch = [Geometry.polygon_moments(Geometry.pad_polygons(polys))] if polys else []
+        if circles:
+            batch.append(Geometry.circle_moments(*np.array(circles).T))
+        m = Geometry.combine(Geometry.join(*batch)) if batch else None
+        if not m or m['A'] == 0:
             QMessageBox.warning(self, 'Compute', 'Zero total area')
             return
-        cx = cx_num / total_area
-        cy = cy_num / total_area
-        msg = f'Total Area: {total_area:.3f}\nCentroid: ({cx:.3f}, {cy:.3f})\nIxx: {Ixx_total:.3f}\nIyy: {Iyy_total:.3f}\nIxy: {Ixy_total:.3f}'
+        msg = (f"Total Area: {m['A']:.3f}\nCentroid: ({m['cx']:.3f}, {m['cy']:.3f})\n"
+               f"Ixx: {m['Ixx']:.3f}\nIyy: {m['Iyy']:.3f}\nIxy: {m['Ixy']:.3f}\n(about the centroid)")
         QMessageBox.information(self, 'Properties', msg)
 
     # ---------- Selection handling & properties panel ----------
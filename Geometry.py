@@ -0,0 +1,135 @@
+import numpy
+
+#area, centroid and second moments of whole batches of shapes at once
+#every function returns a dictionary of arrays, one value per shape:
+#A, cx, cy (centroid), Ixx, Iyy, Ixy (about the shape's own centroid)
+#shapes with (almost) no area get zeros everywhere
+
+names = ["A", "cx", "cy", "Ixx", "Iyy", "Ixy"]
+
+#list of polygons (lists of (x, y), any number of vertices) as one (polygons x vertices x 2) array
+#shorter polygons are padded by repeating their last vertex: a zero-length edge adds nothing to any moment
+def pad_polygons(polygons):
+    longest = max([len(p) for p in polygons], default=0)
+    out = numpy.zeros((len(polygons), max(longest, 1), 2))
+    for i, p in enumerate(polygons):
+        if len(p) == 0: continue
+        out[i, :len(p)] = p
+        out[i, len(p):] = p[-1]
+    return out
+
+#moments of every polygon in a (polygons x vertices x 2) array (see pad_polygons), either orientation
+#(shoelace formulas, with every polygon moved to its first vertex first so far-away shapes don't lose precision)
+def polygon_moments(polygons):
+    polygons = numpy.asarray(polygons, dtype=float).reshape(-1, numpy.shape(polygons)[-2], 2)
+    origin = polygons[:, :1]
+    x = polygons[..., 0] - origin[..., 0]
+    y = polygons[..., 1] - origin[..., 1]
+    x2 = numpy.roll(x, -1, axis=1)
+    y2 = numpy.roll(y, -1, axis=1)
+    a = x * y2 - x2 * y
+
+    A = a.sum(axis=1) / 2
+    ok = numpy.abs(A) > 1e-9
+    safe = numpy.where(ok, A, 1)
+    cx = ((x + x2) * a).sum(axis=1) / (6 * safe)
+    cy = ((y + y2) * a).sum(axis=1) / (6 * safe)
+
+    #about the first vertex, then moved to the centroid
+    Ixx = ((y * y + y * y2 + y2 * y2) * a).sum(axis=1) / 12 - A * cy ** 2
+    Iyy = ((x * x + x * x2 + x2 * x2) * a).sum(axis=1) / 12 - A * cx ** 2
+    Ixy = ((x * y2 + 2 * x * y + 2 * x2 * y2 + x2 * y) * a).sum(axis=1) / 24 - A * cx * cy
+
+    #clockwise polygons come out negative
+    sign = numpy.where(A < 0, -1, 1)
+    out = {
+        "A" : A * sign,
+        "cx" : cx + origin[:, 0, 0],
+        "cy" : cy + origin[:, 0, 1],
+        "Ixx" : Ixx * sign,
+        "Iyy" : Iyy * sign,
+        "Ixy" : Ixy * sign,
+    }
+    return {k : numpy.where(ok, v, 0.0) for k, v in out.items()}
+
+#exact moments of circles (centres cx, cy and radii r, any shape of arrays)
+def circle_moments(cx, cy, r):
+    cx, cy, r = numpy.broadcast_arrays(*[numpy.asarray(v, dtype=float).ravel() for v in (cx, cy, r)])
+    I = numpy.pi * r ** 4 / 4
+    return {
+        "A" : numpy.pi * r ** 2,
+        "cx" : cx.copy(),
+        "cy" : cy.copy(),
+        "Ixx" : I,
+        "Iyy" : I.copy(),
+        "Ixy" : numpy.zeros(len(r)),
+    }
+
+#corners of rectangles [x, y, w, h] (central coordinates, like CrossSection), as (rectangles x 4 x 2)
+def rect_polygons(rects):
+    x, y, w, h = numpy.reshape(numpy.asarray(rects, dtype=float), (-1, 4)).T
+    dx = numpy.array([-1, 1, 1, -1]) / 2
+    dy = numpy.array([-1, -1, 1, 1]) / 2
+    return numpy.stack([x[:, None] + w[:, None] * dx, y[:, None] + h[:, None] * dy], axis=2)
+
+#points rotated by angle (degrees, counterclockwise) about origin
+def rotate(points, angle, origin=(0, 0)):
+    t = numpy.radians(angle)
+    points = numpy.asarray(points, dtype=float) - origin
+    c, s = numpy.cos(t), numpy.sin(t)
+    return numpy.stack([c * points[..., 0] - s * points[..., 1], s * points[..., 0] + c * points[..., 1]], axis=-1) + origin
+
+#moments of shapes exported by the GUI (dictionaries with 'type', 'pos', 'rotation', ...), in the same order
+#rectangle: 'pos' is the bottom-left corner, 'w', 'h' rotated about it by 'rotation'
+#circle: 'pos' is the centre, radius 'r' (exact, not a 64-gon)
+#polygon: 'points' are already where they are drawn
+#anything else (groups, glue tabs, ...) has no area
+def shape_moments(shapes):
+    polygons = []
+    where = []
+    circles = []
+    for i, d in enumerate(shapes):
+        t = d.get("type")
+        pos = d.get("pos", (0, 0))
+        if t == "rectangle":
+            w, h = d.get("w", 0), d.get("h", 0)
+            corners = numpy.array([(0, 0), (w, 0), (w, h), (0, h)], dtype=float) + pos
+            polygons.append(rotate(corners, d.get("rotation", 0), pos))
+            where.append(i)
+        elif t == "polygon" and len(d.get("points", [])) >= 3:
+            polygons.append(numpy.asarray(d["points"], dtype=float))
+            where.append(i)
+        elif t == "circle":
+            circles.append((i, pos[0], pos[1], d.get("r", 0)))
+
+    out = {k : numpy.zeros(len(shapes)) for k in names}
+    if polygons:
+        m = polygon_moments(pad_polygons(polygons))
+        for k in names: out[k][where] = m[k]
+    if circles:
+        i, cx, cy, r = numpy.array(circles).T
+        m = circle_moments(cx, cy, r)
+        for k in names: out[k][i.astype(int)] = m[k]
+    return out
+
+#several batches of moments as one
+def join(*moments):
+    return {k : numpy.concatenate([numpy.ravel(m[k]) for m in moments]) for k in names}
+
+#moments of all shapes together, about the combined centroid (parallel axis theorem)
+#takes in a dictionary of arrays (any of the functions above), returns dictionary of floats
+def combine(moments):
+    A = moments["A"].sum()
+    if A == 0: return {k : 0.0 for k in names}
+    cx = (moments["A"] * moments["cx"]).sum() / A
+    cy = (moments["A"] * moments["cy"]).sum() / A
+    dx = moments["cx"] - cx
+    dy = moments["cy"] - cy
+    return {
+        "A" : A,
+        "cx" : cx,
+        "cy" : cy,
+        "Ixx" : (moments["Ixx"] + moments["A"] * dy ** 2).sum(),
+        "Iyy" : (moments["Iyy"] + moments["A"] * dx ** 2).sum(),
+        "Ixy" : (moments["Ixy"] + moments["A"] * dx * dy).sum(),
+    }
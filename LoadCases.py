@@ -0,0 +1,51 @@
+import numpy
+import BMD
+import SharedPool
+
+#load cases compared on every design, given as car weights (m1, m2, m3) in N
+load_cases = {
+    "load case 1" : (400 / 3, 400 / 3, 400 / 3),
+    "final" : (439, 289, 318),
+}
+
+#envelopes of one load case, returned to the parent process
+#the beam and settings shared by all load cases are in the worker's state (see SharedPool.start_worker)
+def envelope_job(case):
+    worker = SharedPool.worker
+    return BMD.envelopes(case, worker["offsets"], worker["analytic"], worker["beam"])
+
+#envelopes of load case i, written straight into the shared output arrays (nothing is sent back)
+def shared_job(job):
+    i, case = job
+    env, gov = envelope_job(case)
+    SharedPool.worker["arrays"][0][i] = env
+    SharedPool.worker["arrays"][1][i] = gov
+
+#generates the envelopes of every load case in a list, spread over a pool of processes
+#cases are anything BMD.envelopes takes as a load case (car weights by default)
+#returns tuple of arrays (env, gov), both (load cases x stations x 6), columns as in BMD.envelope_labels
+#shared = True has the workers write into shared memory instead of pickling their results back
+def run(cases, processes=None, offsets=None, analytic=False, beam=None, shared=False):
+    if beam is None: beam = BMD.bridge
+    cases = list(cases)
+    settings = {"offsets" : offsets, "analytic" : analytic, "beam" : beam}
+
+    if not shared:
+        with SharedPool.pool(processes, settings=settings) as pool:
+            results = pool.map(envelope_job, cases)
+        return numpy.stack([r[0] for r in results]), numpy.stack([r[1] for r in results])
+
+    shape = (len(cases), len(beam.stations), 6)
+    with SharedPool.SharedArrays([(shape, float), (shape, BMD.train_positions(offsets, beam).dtype)]) as outputs:
+        with SharedPool.pool(processes, outputs, writeable=True, settings=settings) as pool:
+            pool.map(shared_job, list(enumerate(cases)))
+
+        #copy out before the shared blocks are released
+        return tuple(a.copy() for a in outputs.arrays)
+
+if __name__ == "__main__":
+    names = list(load_cases)
+    ENV, GOV = run([load_cases[n] for n in names], shared=True)
+
+    for name, env in zip(names, ENV):
+        print(name, ": Maximum SFE: ", env[:, 2].max(), " Maximum BME: ", env[:, 5].max())
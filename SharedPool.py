@@ -0,0 +1,69 @@
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy
+
+#process pools whose workers all see the same numpy arrays, kept in shared memory instead of pickled to every process
+#with SharedArrays(...) as shared:           --> arrays created in shared memory, released when the block ends
+#    with pool(processes, shared) as p: ...  --> every worker attached to them, as worker["arrays"]
+
+#state of each worker process, set once by start_worker
+worker = {}
+
+#arrays in shared memory, created by the parent process
+#arrays is a list of arrays (copied in) or (shape, dtype) tuples (zeroed)
+#self.arrays are the parent's views of them, only valid until release (end of the with block), so copy out anything kept
+class SharedArrays:
+    def __init__(self, arrays):
+        self.memory = []
+        self.arrays = []
+        try:
+            for a in arrays:
+                if isinstance(a, numpy.ndarray): shape, dtype = a.shape, a.dtype
+                else: (shape, dtype), a = a, None
+                dtype = numpy.dtype(dtype)
+                memory = shared_memory.SharedMemory(create=True, size=max(1, int(numpy.prod(shape)) * dtype.itemsize))
+                self.memory.append(memory)
+                self.arrays.append(numpy.ndarray(shape, dtype=dtype, buffer=memory.buf))
+                if a is None: self.arrays[-1][...] = 0
+                else: self.arrays[-1][...] = a
+        except BaseException:
+            self.release()
+            raise
+
+    #(name, shape, dtype) of every array, all a worker needs to attach to them
+    @property
+    def specs(self):
+        return [(m.name, a.shape, a.dtype) for m, a in zip(self.memory, self.arrays)]
+
+    #frees the shared memory (the views have to go first, or it can't be closed)
+    def release(self):
+        self.arrays = []
+        for m in self.memory:
+            m.close()
+            m.unlink()
+        self.memory = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+#runs in every worker when the pool starts: keeps settings (a dictionary shared by all jobs) in worker,
+#and attaches to the shared arrays, read-only unless writeable
+def start_worker(specs, writeable, settings):
+    worker.update(settings)
+    worker["memory"] = []
+    worker["arrays"] = []
+
+    for name, shape, dtype in specs:
+        memory = shared_memory.SharedMemory(name=name)
+        array = numpy.ndarray(shape, dtype=dtype, buffer=memory.buf)
+        array.flags.writeable = writeable
+        worker["memory"].append(memory)
+        worker["arrays"].append(array)
+
+#multiprocessing.Pool whose workers are attached to shared (SharedArrays, or None for no arrays), see start_worker
+def pool(processes=None, shared=None, writeable=False, settings=None):
+    specs = [] if shared is None else shared.specs
+    return multiprocessing.Pool(processes, start_worker, (specs, writeable, settings or {}))
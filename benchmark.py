@@ -0,0 +1,210 @@
+import json
+import os
+import sys
+import time
+import numpy
+import BMD
+import CrossSection
+import optimize
+
+#times the analysis hot paths at a few scales, writes the results to benchmark_results.json
+#and compares them against benchmark_baseline.json (if there is one)
+#python benchmark.py          --> run, write results, compare against the baseline
+#python benchmark.py --save   --> run, and store the results as the new baseline
+#python benchmark.py <filter> --> only run the benchmarks whose name contains <filter>
+
+folder = os.path.dirname(os.path.abspath(__file__))
+results_file = os.path.join(folder, "benchmark_results.json")
+baseline_file = os.path.join(folder, "benchmark_baseline.json")
+
+#span (mm), station resolution (mm), sample_frequency (mm) of every bridge scale
+bridge_scales = [
+    (1250, 1, 1),
+    (1250, 0.5, 0.5),
+    (2500, 1, 1),
+]
+
+#cross-sections from Design Iterations, and how many times each is repeated side by side (rectangle count)
+section_files = ["design0.txt", "design6_middle.txt", "design6_supports.txt"]
+section_repeats = [1, 4, 16]
+#number of strips each horizontal plate is split into (laminated flanges)
+section_laminations = [4, 16]
+
+#number of candidate sections evaluated together by CrossSection.batch_properties
+batch_sizes = [100, 1000]
+
+#number of zones of the section schedules optimize.FOS_array is run on (the bridge has 5)
+schedule_zones = [5, 50]
+
+#each benchmark is repeated until it has run for at least this long (s), best of `repeat` kept
+min_time = 0.2
+repeat = 5
+
+#ratios (now / baseline) further than this from 1 are flagged as slower / faster
+tolerance = 1.3
+
+#seconds per call of fn, best of `repeat` runs
+def time_call(fn):
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number): fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat or number >= 1 << 20: break
+        number *= 2
+
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number): fn()
+        best = min(best, time.perf_counter() - start)
+    return best / number
+
+#vertex lists of a design file
+def load_section(file_name):
+    return CrossSection.load_file(os.path.join(folder, "Design Iterations", file_name))
+
+#rectangles of the section repeated n times side by side, to get more rectangles with the same shape
+#the copies are shifted by a whole number of mm before converting, so their edges are as exact as the original's,
+#and far enough apart that the cut planes of make_wider (+500 mm) stay within their own copy
+def repeat_section(polygons, n):
+    xs = [v[0] for p in polygons for v in p]
+    shift = int(numpy.ceil(max(xs) - min(xs))) + 500
+    return [CrossSection.convert_to_rect([(v[0] + k * shift, v[1]) for v in p]) for k in range(n) for p in polygons]
+
+#every horizontal plate split into n strips stacked on top of each other (like a laminated flange)
+def laminate(rects, n):
+    out = []
+    for x, y, w, h in rects:
+        if w <= h:
+            out.append([x, y, w, h])
+            continue
+        out.extend([[x, y - h / 2 + (k + 0.5) * h / n, w, h / n] for k in range(n)])
+    return out
+
+#name --> (parameters, function to time) of every benchmark
+def benchmarks():
+    out = {}
+    default = BMD.sample_frequency
+
+    for span, resolution, frequency in bridge_scales:
+        params = {"span" : span, "resolution" : resolution, "sample_frequency" : frequency}
+        tag = "[span=%g,res=%g,freq=%g]" % (span, resolution, frequency)
+        pos = span / 2
+        beam = BMD.Beam(span, (25, span - 25), resolution)
+
+        #sample_frequency is a global of BMD, so it is only set while the benchmark runs
+        def scaled(fn, beam=beam, frequency=frequency):
+            def run():
+                BMD.sample_frequency = frequency
+                try: return fn(beam)
+                finally: BMD.sample_frequency = default
+            return run
+
+        out["find_reactions" + tag] = (params, scaled(lambda beam, pos=pos: BMD.find_reactions(pos, beam=beam)))
+        out["sfd" + tag] = (params, scaled(lambda beam, pos=pos: BMD.sfd(BMD.find_reactions(pos, beam=beam), beam)))
+        out["bmd" + tag] = (params, scaled(lambda beam, pos=pos: BMD.bmd(pos, beam=beam)))
+        out["BME" + tag] = (params, scaled(lambda beam, pos=pos: BMD.BME(beam)))
+
+    for file_name in section_files:
+        base = load_section(file_name)
+
+        for n in section_repeats:
+            rects = repeat_section(base, n)
+            params = {"section" : file_name, "repeats" : n, "rectangles" : len(rects)}
+            tag = "[%s,rects=%d]" % (file_name, len(rects))
+
+            ybar = CrossSection.ybar(rects)
+            I = CrossSection.I(rects)
+            Q = CrossSection.Q(rects, ybar, ybar)
+            horizontal = [r for r in rects if r[2] > r[3]]
+            taller = CrossSection.make_taller([r for r in rects if r[2] <= r[3]])
+            heights = numpy.linspace(min([r[1] - r[3] / 2 for r in rects]), max([r[1] + r[3] / 2 for r in rects]), 50)
+
+            def cleave_all(horizontal=horizontal, taller=taller):
+                for h in horizontal: CrossSection.cleave(h, taller)
+
+            def Q_profile(rects=rects, heights=heights, ybar=ybar):
+                for y in heights: CrossSection.Q(rects, y, ybar)
+
+            out["cleave" + tag] = (params, cleave_all)
+            out["split_all" + tag] = (params, lambda horizontal=horizontal, taller=taller: CrossSection.split_all(horizontal, taller, 0))
+            out["Q" + tag] = (params, Q_profile)
+            out["plate_buckling" + tag] = (params, lambda rects=rects, ybar=ybar, I=I, Q=Q:
+                                           optimize.plate_buckling(rects, ybar, 1e5, 500, I, Q, 600))
+            #per-station part only, with the classification done once (as FOS_whole_bridge does through a Section)
+            classes = optimize.plate_classes(rects, ybar)
+            out["plate_fos" + tag] = (params, lambda classes=classes, I=I, Q=Q: optimize.plate_fos(classes, 1e5, 500, I, Q, 600))
+
+        #laminated flanges: many thin strips in the same place
+        for n in section_laminations:
+            rects = laminate(repeat_section(base, 1), n)
+            params = {"section" : file_name, "laminations" : n, "rectangles" : len(rects)}
+            ybar = CrossSection.ybar(rects)
+            I = CrossSection.I(rects)
+            Q = CrossSection.Q(rects, ybar, ybar)
+            out["plate_buckling[%s,laminated=%d,rects=%d]" % (file_name, n, len(rects))] = (params,
+                lambda rects=rects, ybar=ybar, I=I, Q=Q: optimize.plate_buckling(rects, ybar, 1e5, 500, I, Q, 600))
+
+    #candidate sections: the design files with every copy stretched a little differently
+    base = [repeat_section(load_section(f), 1) for f in section_files]
+    for n in batch_sizes:
+        scales = numpy.linspace(0.5, 1.5, n)
+        candidates = [[[x * k, y, w * k, h] for x, y, w, h in base[i % len(base)]] for i, k in enumerate(scales)]
+        rects, mask = CrossSection.pad_sections(candidates)
+        out["batch_properties[sections=%d]" % n] = ({"sections" : n},
+            lambda rects=rects, mask=mask: CrossSection.batch_properties(rects, mask))
+
+    #whole bridge, the three cross-sections taking turns in n equal zones
+    #(new Sections every run, so their properties are computed each time, once per cross-section however many zones)
+    ENV, GOV = BMD.cached_envelopes(analytic=True)
+    for n in schedule_zones:
+        def fos_zones(n=n):
+            sections = [CrossSection.Section(rects) for rects in base]
+            zones = [(1250 * k / n, sections[k % len(sections)]) for k in range(n)]
+            optimize.FOS_array(ENV[:1250, 2], ENV[:1250, 5], CrossSection.SectionSchedule(zones))
+        out["FOS_array[zones=%d]" % n] = ({"zones" : n}, fos_zones)
+    return out
+
+#runs every benchmark whose name contains name_filter, returns {name : {parameters..., "seconds" : t}}
+def run(name_filter=""):
+    out = {}
+    for name, (params, fn) in benchmarks().items():
+        if name_filter not in name: continue
+        out[name] = dict(params, seconds=time_call(fn))
+        print("%-55s %12.6f ms" % (name, out[name]["seconds"] * 1e3))
+    return out
+
+#prints current / baseline time of every benchmark in both
+def compare(results, baseline):
+    print()
+    print("%-55s %12s %12s %8s" % ("BENCHMARK", "BASE (ms)", "NOW (ms)", "RATIO"))
+    for name, result in results.items():
+        if name not in baseline: continue
+        before = baseline[name]["seconds"]
+        ratio = result["seconds"] / before
+        note = "  slower" if ratio > tolerance else ("  faster" if ratio < 1 / tolerance else "")
+        print("%-55s %12.6f %12.6f %8.2f%s" % (name, before * 1e3, result["seconds"] * 1e3, ratio, note))
+
+def write_json(file_name, data):
+    with open(file_name, "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    save = "--save" in args
+    name_filter = ([a for a in args if a != "--save"] + [""])[0]
+
+    results = run(name_filter)
+    write_json(results_file, results)
+
+    if save:
+        #only the benchmarks that were run are replaced
+        baseline = {}
+        if os.path.exists(baseline_file):
+            with open(baseline_file) as f: baseline = json.load(f)
+        baseline.update(results)
+        write_json(baseline_file, baseline)
+        print("saved baseline to", baseline_file)
+    elif os.path.exists(baseline_file):
+        with open(baseline_file) as f: compare(results, json.load(f))
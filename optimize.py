@@ -1,6 +1,5 @@
 import BMD
 import CrossSection
-import copy
 import numpy
 import plot
 
@@ -12,8 +11,11 @@ import plot
 
 
 #5-6 --> Shear Stresses
-#material shear stress tau = VQ / Ib
-#glue tab shear stress calculated manually, since writing a program is difficult
+#material shear stress tau = VQ / Ib, checked at the height where Q / b is largest (not only at the centroid)
+#glue shear stress tau = VQ / Ib at every horizontal glue joint (found by CrossSection.glue_joints, or the file's glue tabs),
+#b = contact width of the joint, checked at the joint where Q / b is largest
+#only horizontal joints are checked: vertical contacts (e.g. a web against the side of a tab) are left out,
+#and a web drawn standing on a flange counts as glued along its edge only (b = web thickness)
 
 #7-10 --> Plate Buckling
 #Case 1 --> secured on two side and compressive stress applied normal to cross-section
@@ -24,6 +26,7 @@ import plot
 #diaphragm spacing, 0 and 1250 are necessary for code to run, but aren't actually placed in the bridge
 #distributed densely closer to supports, and more rarely towards the middle
 #total of 6 diaphragms
+#(Diaphragms.py searches counts and positions for the best layout)
 #diaphragm_spacing = [30, 150, 350, 630, 910, 1110,]#
 diaphragm_spacing = [0, 20, 30, 425, 825, 1220, 1230, 1250]
 #diaphragm_spacing = [0, 25, 425, 825, 1225, 1250]
@@ -67,8 +70,21 @@ def shear_stress(V, Q, I, b):
 
 
 #function calculates all plate buckling FOS + returns as dictionary
+#the pieces of plate and their buckling cases only depend on the cross-section, so for a CrossSection.Section
+#they are worked out once (plate_classes) and every call after that only applies M and V (plate_fos)
 def plate_buckling(rects, ybar, M, V, I, Q, pos):
-    global E, mu, sigma_C, diaphragm_spacing
+    if isinstance(rects, CrossSection.Section):
+        classes = rects.cached(("plate_classes", ybar), lambda s: plate_classes(s, ybar))
+    else:
+        classes = plate_classes(rects, ybar)
+    return plate_fos(classes, M, V, I, Q, pos)
+
+#sorts the plates of a cross-section into the 4 plate buckling cases, and precomputes what each case needs:
+#"moment" --> {case : sigma_crit / (distance from ybar to top of piece)} of every case 1, 2, 3 piece, so M_min = that * I
+#"shear" --> thickness t, height h and b (for VQ / Ib) of every case 4 piece
+#(b is still CrossSection.width_at_location(rects, case number), as it always was)
+def plate_classes(rects, ybar):
+    global E, mu
 
     #begins by splitting cross-section (defined as an array of rectangles [x, y, w, h]) into vertical and horizontal rectangles
     #Case 1-2: Horizontal
@@ -81,16 +97,14 @@ def plate_buckling(rects, ybar, M, V, I, Q, pos):
         if (i[2] > i[3]): h_rects.append(i)
         else: v_rects.append(i)
 
-    h_split = []
-
     #extends vertical rectangles to make them 'cut planes' by which to split horizontal rectangles
     #create an array of 'taller' vertical rectangles, which are used to 'cleave' the horizontal rects s.t.
     #they can be classified according to the plate buckling cases
-    taller = CrossSection.make_taller(v_rects)
+    #indexed once, since every horizontal piece is checked against them below
+    taller = CrossSection.RectIndex(CrossSection.make_taller(v_rects))
 
-    #loops through all horizontal rectangles, and cleaves each rectangle using 'taller' array (separates it)
-    for h in h_rects:
-        h_split.extend(CrossSection.cleave(h, taller))
+    #cleaves all horizontal rectangles using 'taller' array (separates them), in one sweep
+    h_split = CrossSection.split_all(h_rects, taller, 0)
 
     #dictionary containing a rectangles (converted to tuple) as key
     #and type of buckling that occurs as the value
@@ -106,8 +120,8 @@ def plate_buckling(rects, ybar, M, V, I, Q, pos):
         wider_left = [h[0] - 0.6, h[1], h[2] + 1, h[3]]
         wider_right = [h[0] + 0.6, h[1], h[2] + 1, h[3]]
 
-        int_left = CrossSection.int_list(wider_left, taller)
-        int_right = CrossSection.int_list(wider_right, taller)
+        int_left = taller.any(wider_left)
+        int_right = taller.any(wider_right)
 
         #if rectangle below centroid axis its in tension, hence needs to be filtered out not to mess with results
         if (h[1] - h[3] / 2 > ybar): 
@@ -115,13 +129,11 @@ def plate_buckling(rects, ybar, M, V, I, Q, pos):
             type_dict[tuple(h)] = (1 if (int_left and int_right) else 2)
 
     #similar with verticals: separate verticals using horizontal rectangles as 'cut planes'
-    v_split = []
     #create 'cut planes'
     wider = CrossSection.make_wider(h_rects)
 
     #cut verts with cut planes
-    for v in v_rects:
-        v_split.extend(CrossSection.cleave(v, wider))
+    v_split = CrossSection.split_all(v_rects, wider, 1)
 
 
     #removes the section of each rectangle below the centroid axis (hence in tension)
@@ -156,63 +168,122 @@ def plate_buckling(rects, ybar, M, V, I, Q, pos):
             type_dict[tuple(v)] = 4
 
     
-    #now do math for every type
-    #originally begin with 'infinity' FOS, and go down to minimum check
-    min1 = min2 = min3 = min4 = float("inf")
-
-    #print_dict(type_dict)
-
-    #find all FOS
-    #loop through created dictionary, and use value of dictionary to calculate according FOS
+    #now do the geometry part of the math for every type
     #Case 1-3 all use My / I to find FOS
     #Case 4 uses VQ / Ib
-    for i in type_dict.items():
-        #case 1
-        if (i[1] == 1):
-            sigma_crit = 4 * numpy.pi ** 2 * E / 12 / (1 - mu ** 2) * (i[0][3] / i[0][2]) ** 2
-            M_min = sigma_crit * I / (i[0][1] + i[0][3] / 2 - ybar)
-            min1 = min(min1, float("inf") if M == 0 else M_min / M)
-        
-        #case 2
-        elif (i[1] == 2):
-            sigma_crit = 0.425 * numpy.pi ** 2 * E / 12 / (1 - mu ** 2) * (i[0][3] / i[0][2]) ** 2
-            M_min = sigma_crit * I / (i[0][1] + i[0][3] / 2 - ybar)
-
-            min2 = min(min2, float("inf") if M == 0 else M_min / M)
-        
-        #case 3 + case 7
-        if (i[1] == 3 or i[1] == 7):
-            sigma_crit = 6 * numpy.pi ** 2 * E / 12 / (1 - mu ** 2) * (i[0][2] / i[0][3]) ** 2
-            M_min = sigma_crit * I / (i[0][1] + i[0][3] / 2 - ybar)
-            min3 = min(min3, float("inf") if M == 0 else M_min / M)
-
-        #case 4 + case 7
-        if (i[1] == 4 or i[1] == 7):
-            #go through all diaphragms, and find between which two the current position, 'pos' falls within
-            for j in range(1, len(diaphragm_spacing)):
-                #if not betwen these two, skip
-                if not (diaphragm_spacing[j - 1] <= pos <= diaphragm_spacing[j]): continue
-
-                #FOS calculated using tau = VQ / Ib
-
-                #find a, diaphragm spacing
-                a = diaphragm_spacing[j] - diaphragm_spacing[j - 1]
-                #find b for VQ / Ib
-                b = CrossSection.width_at_location(rects, i[1])
-
-                tau_allowable = 5 * numpy.pi ** 2 * E / 12 / (1 - mu ** 2) * ((i[0][2] / a) ** 2 + (i[0][2] / i[0][3]) ** 2)
-                tau_current = V * Q / I / b
-
-                min4 = min(min4, float("inf") if tau_current == 0 else tau_allowable / tau_current)
-                break
-    #return 4 cases as a dictionary
+    k = 4 * numpy.pi ** 2 * E / 12 / (1 - mu ** 2)
+    moment = {1 : [], 2 : [], 3 : []}
+    t, h, b = [], [], []
+    for (x, y, w, height), case in type_dict.items():
+        #distance from centroid to top of piece
+        d = y + height / 2 - ybar
+        if case == 1: moment[1].append(k * (height / w) ** 2 / d)
+        elif case == 2: moment[2].append(0.425 / 4 * k * (height / w) ** 2 / d)
+        if case == 3 or case == 7: moment[3].append(6 / 4 * k * (w / height) ** 2 / d)
+        if case == 4 or case == 7:
+            t.append(w)
+            h.append(height)
+            b.append(CrossSection.width_at_location(rects, case))
+
     return {
-        "CASE 1 PLATE BUCKLING" : (1e3 if min1 == float("inf") else abs(min1)), 
-        "CASE 2 PLATE BUCKLING" : (1e3 if min2 == float("inf") else abs(min2)), 
-        "CASE 3 PLATE BUCKLING" : (1e3 if min3 == float("inf") else abs(min3)), 
-        "CASE 4 PLATE BUCKLING" : (1e3 if min4 == float("inf") else abs(min4)), 
+        "moment" : {case : numpy.array(v) for case, v in moment.items()},
+        "shear" : (numpy.array(t), numpy.array(h), numpy.array(b)),
     }
 
+#plate buckling FOS of a classified cross-section (plate_classes) under moment M and shear V at position pos
+def plate_fos(classes, M, V, I, Q, pos):
+    out = plate_fos_array(classes, [M], [V], I, Q, [pos])[0]
+    return dict(zip(fos_labels[4:], out.tolist()))
+
+#plate buckling FOS (cases 1-4 as columns) of a classified cross-section at many stations at once
+#M, V and pos are arrays, one value per station
+#spacing = diaphragm positions, diaphragm_spacing if not given
+def plate_fos_array(classes, M, V, I, Q, pos, spacing=None):
+    global E, mu, diaphragm_spacing
+    M = numpy.asarray(M, dtype=float)
+    V = numpy.asarray(V, dtype=float)
+    pos = numpy.asarray(pos, dtype=float)
+
+    #originally begin with 'infinity' FOS, and go down to minimum check
+    out = numpy.full((len(M), 4), numpy.inf)
+
+    #cases 1-3: smallest M_min / M (largest if M is negative)
+    for case, coefficients in classes["moment"].items():
+        if len(coefficients) == 0: continue
+        loaded = M != 0
+        out[loaded, case - 1] = numpy.where(M[loaded] > 0, coefficients.min(), coefficients.max()) * I / M[loaded]
+
+    #case 4: find between which two diaphragms every position falls (the first pair, if it is on one)
+    t, h, b = classes["shear"]
+    spacing = numpy.asarray(diaphragm_spacing if spacing is None else spacing, dtype=float)
+    j = numpy.clip(numpy.searchsorted(spacing, pos), 1, len(spacing) - 1)
+    inside = (spacing[0] <= pos) & (pos <= spacing[-1])
+    if len(t) and inside.any():
+        #find a, diaphragm spacing
+        a = (spacing[j] - spacing[j - 1])[inside, None]
+
+        #FOS calculated using tau = VQ / Ib, every piece at every station
+        tau_allowable = 5 * numpy.pi ** 2 * E / 12 / (1 - mu ** 2) * ((t / a) ** 2 + (t / h) ** 2)
+        tau_current = (V[inside] * Q / I)[:, None] / b
+        with numpy.errstate(divide="ignore"):
+            out[inside, 3] = numpy.where(tau_current == 0, numpy.inf, tau_allowable / numpy.where(tau_current == 0, 1, tau_current)).min(axis=1)
+
+    return numpy.where(numpy.isinf(out), 1e3, numpy.abs(out))
+
+#failure modes, in the order of the columns of FOS_array
+fos_labels = [
+    "Compression",
+    "Tension",
+    "Material Shear Stress",
+    "Glue Shear Stress",
+    "CASE 1 PLATE BUCKLING",
+    "CASE 2 PLATE BUCKLING",
+    "CASE 3 PLATE BUCKLING",
+    "CASE 4 PLATE BUCKLING",
+]
+
+#FOS of every failure mode at every station, with array operations over all the stations of each cross-section
+#SFD_ENV and BMD_ENV are given at every mm from 0 (station i is at i mm), takes in the three cross-sections as FOS_whole_bridge,
+#or a CrossSection.SectionSchedule as supports (any number of zones, edge and middle left out)
+#spacing = diaphragm positions, diaphragm_spacing if not given
+#returns tuple (array (stations x failure modes), labels of the columns)
+def FOS_array(SFD_ENV, BMD_ENV, supports, edge=None, middle=None, spacing=None):
+    global sigma_C, sigma_T, tau_max, tau_glue
+    M = numpy.asarray(BMD_ENV, dtype=float)
+    V = numpy.asarray(SFD_ENV, dtype=float)
+    pos = numpy.arange(len(M))
+
+    schedule = supports if isinstance(supports, CrossSection.SectionSchedule) else CrossSection.zone_schedule(supports, edge, middle)
+    #zone of the cross-section used at every station
+    zones = schedule.indices(pos)
+
+    out = numpy.full((len(M), len(fos_labels)), 1e3)
+    for section, indices in schedule.groups():
+        at = numpy.isin(zones, indices)
+        if not at.any(): continue
+
+        #everything that only depends on the cross-section, computed once
+        ybar, I = section.ybar, section.I
+        Q = CrossSection.Q(section, ybar, ybar)
+        height, Q_max, b_max = section.profile.critical()
+        height_glue, Q_glue, b_glue = CrossSection.glue_critical(section)
+        classes = section.cached(("plate_classes", ybar), lambda s: plate_classes(s, ybar))
+        m, v = M[at], V[at]
+
+        with numpy.errstate(divide="ignore"):
+            out[at, 0] = numpy.abs(sigma_C / (m * section.y_top / I))
+            out[at, 1] = numpy.abs(sigma_T / (m * section.y_bot / I))
+        out[at, 2] = shear_fos(v, Q_max, I, b_max, tau_max)
+        out[at, 3] = shear_fos(v, Q_glue, I, b_glue, tau_glue)
+        out[at, 4:] = plate_fos_array(classes, m, numpy.abs(v), I, Q, pos[at], spacing)
+
+    return out, list(fos_labels)
+
+#shear FOS allowed / (VQ / Ib) at every station (V array), 1e3 where there is no shear stress (or b = 0)
+def shear_fos(V, Q, I, b, allowed):
+    tau = numpy.abs(V * Q / I / b) if b != 0 else numpy.zeros(len(V))
+    return numpy.where(tau == 0, 1e3, allowed / numpy.where(tau == 0, 1, tau))
+
 #code used to calculated FOS of all the different modes of failure
 #across the length of the bridge
 #also accounts for changing cross-section
@@ -220,82 +291,36 @@ def plate_buckling(rects, ybar, M, V, I, Q, pos):
 #supports = cross-section at supports
 #edge = cross-section between supports and middle 
 #middle = cross-section at middle (~) of span
-def FOS_whole_bridge(SFD_ENV, BMD_ENV, supports, edge, middle):
-    #need to pre-calculate all the values for the sake of efficiency
-
-    #supports
-    ybar_s = CrossSection.ybar(supports)
-    y_top_s = CrossSection.ybar_top(supports)
-    y_bot_s = CrossSection.ybar_bot(supports)
-
-    I_s = CrossSection.I(supports)
-    Q_s = CrossSection.Q(supports, ybar_s, ybar_s)
-    b_s = CrossSection.width_at_location(supports, ybar_s)
-
-    #middle cross-section
-    ybar_m = CrossSection.ybar(middle)
-    y_top_m = CrossSection.ybar_top(middle)
-    y_bot_m = CrossSection.ybar_bot(middle)
-
-    I_m = CrossSection.I(middle)
-    Q_m = CrossSection.Q(middle, ybar_m, ybar_m)
-    b_m = CrossSection.width_at_location(middle, ybar_m)
-
-    #edge (between support and middle)
-    ybar_e = CrossSection.ybar(edge)
-    y_top_e = CrossSection.ybar_top(edge)
-    y_bot_e = CrossSection.ybar_bot(edge)
-
-    I_e = CrossSection.I(edge)
-    Q_e = CrossSection.Q(edge, ybar_e, ybar_e)
-    b_e = CrossSection.width_at_location(edge, ybar_e)
-
-    #returns both a list of strings (?) that were initially
-    #printed on a text file, but later got used in plot.py to graph
-    out = []
-
-    #also prints minimum factors of safety with corresponding failure modes (minout)
-    minout = {}
-
-    #loop through length of whole bridge, and determine factors of safety for the entire length
-    for i in range(1250):
-        #returns 'mode' or type of cross-section used
-        mode = CrossSection.cross_section_at_pos(i)
-
-        #compute dictionary according to mode (and combine into one)
-        if (mode == "support"):
-            FOS = flex_stress(BMD_ENV[i], I_s, y_top_s, y_bot_s)
-            FOS = FOS | shear_stress(SFD_ENV[i], Q_s, I_s, b_s)
-            FOS = FOS | plate_buckling(supports, ybar_s, BMD_ENV[i], abs(SFD_ENV[i]), I_s, Q_s, i)
-        elif (mode == "edge"):
-            FOS = flex_stress(BMD_ENV[i], I_e, y_top_e, y_bot_e)
-            FOS = FOS | shear_stress(SFD_ENV[i], Q_e, I_e, b_e)
-            FOS = FOS | plate_buckling(edge, ybar_e, BMD_ENV[i], abs(SFD_ENV[i]), I_e, Q_e, i)
-        elif (mode == "middle"):
-            FOS = flex_stress(BMD_ENV[i], I_m, y_top_m, y_bot_m)
-            FOS = FOS | shear_stress(SFD_ENV[i], Q_m, I_m, b_m)
-            FOS = FOS | plate_buckling(middle, ybar_m, BMD_ENV[i], abs(SFD_ENV[i]), I_m, Q_m, i)
-        
-        #create minout & min it with FOS every loop
-        if (i == 0): pass
-        elif (i == 1): minout = copy.deepcopy(FOS)
-        else:
-            minout = {key: min(minout[key], FOS[key]) for key in minout}
-        
-        
-        if (i == 0):
-            out.append(to_string(FOS.keys(), -1))
-
-        out.append(to_string(FOS.values(), i))
-    
-    #print factors of safety (minima)
+#(or a CrossSection.SectionSchedule as supports, for any other zones or tapering sections)
+#prints the minimum FOS of every mode, and returns the table as strings (see FOS_rows)
+def FOS_whole_bridge(SFD_ENV, BMD_ENV, supports, edge=None, middle=None):
+    schedule = supports if isinstance(supports, CrossSection.SectionSchedule) else CrossSection.zone_schedule(supports, edge, middle)
+    #stations 0 .. 1249 mm
+    fos, labels = FOS_array(SFD_ENV[:1250], BMD_ENV[:1250], schedule)
+
+    #print factors of safety (minima, leaving out position 0)
+    minout = dict(zip(labels, fos[1:].min(axis=0).tolist()))
     print_FOS(dict(sorted(minout.items(), key=lambda item: item[1], reverse=False)))
 
-    #return array of strings
+    #glue shear only covers horizontal joints, so print which one governs and how wide it is
+    station = 1 + int(numpy.argmin(fos[1:, labels.index("Glue Shear Stress")]))
+    height, Q, b = CrossSection.glue_critical(schedule.at(station))
+    if height is not None:
+        print("Glue Shear Stress: horizontal joints only (vertical contacts aren't checked), worst at y = %g mm, b = %g mm of contact, %d mm along the bridge" % (height, b, station))
+
+    return FOS_rows(fos, labels)
+
+#FOS table as a list of strings (?) that were initially printed on a text file, and are what plot.py graphs:
+#a header row, then "position,FOS,FOS,..." for every station
+def FOS_rows(fos, labels):
+    out = [to_string(labels, -1)]
+    for i, row in enumerate(fos.tolist()):
+        out.append(to_string(row, i))
     return out
 
 
-#print dictionary in readable format
+#one row of the FOS table as a comma-separated string: position (mm) then every value
+#pos = -1 gives the header row, with the labels in list
 def to_string(list, pos):
     out = str(pos) + ","
     if pos == -1:
@@ -322,15 +347,16 @@ def print_dict(dict):
 #main
 if __name__ == "__main__":
     #get arrays of rectangles of different cross-sections
-    supports = CrossSection.get_rects("./Design Iterations/design6_supports.txt")
-    edge = CrossSection.get_rects("./Design Iterations/design6_edge.txt")
-    middle = CrossSection.get_rects("./Design Iterations/design6_middle.txt")
+    supports = CrossSection.get_section("./Design Iterations/design6_supports.txt")
+    edge = CrossSection.get_section("./Design Iterations/design6_edge.txt")
+    middle = CrossSection.get_section("./Design Iterations/design6_middle.txt")
 
 
     #git pull --no-rebase
-    #pre-compute SFE and BME
-    BMD_ENV = BMD.BME()
-    SFD_ENV = BMD.SFE()
+    #pre-compute SFE and BME (single sweep of the train)
+    ENV, GOV = BMD.cached_envelopes(analytic=True)
+    SFD_ENV = ENV[:, 2]
+    BMD_ENV = ENV[:, 5]
 
     #supports = CrossSection.get_rects("./test_shape.txt")
     #edge = CrossSection.get_rects("./test_shape.txt")
@@ -0,0 +1,41 @@
+import numpy
+import BMD
+
+#checks that the analytic envelopes (critical train positions only) agree with sweeping every train position
+#python -m pytest test_BMD.py, or python test_BMD.py
+
+#sample frequencies (mm) and load cases (car weights, None = the one in BMD) checked
+sample_frequencies = [1, 3, 7]
+load_cases = [None, (400 / 3, 400 / 3, 400 / 3)]
+
+#how close (relative to the largest value of each column) the envelopes have to be
+tolerance = 1e-10
+
+#runs fn() with BMD.sample_frequency set to frequency (it is a module global)
+def at_frequency(frequency, fn):
+    default = BMD.sample_frequency
+    BMD.sample_frequency = frequency
+    try: return fn()
+    finally: BMD.sample_frequency = default
+
+def test_analytic_envelopes_match_sweep():
+    for frequency in sample_frequencies:
+        for case in load_cases:
+            analytic, gov = at_frequency(frequency, lambda: BMD.envelopes(case, analytic=True))
+            swept, gov = at_frequency(frequency, lambda: BMD.envelopes(case))
+            #(the governing positions can differ where two positions tie, so only the values are compared)
+            scale = numpy.abs(swept).max(axis=0)
+            assert numpy.all(numpy.abs(analytic - swept) <= tolerance * scale), (frequency, case)
+
+def test_absolute_max_moment_matches_BME():
+    for frequency in sample_frequencies:
+        for case in load_cases:
+            moment, station, position = at_frequency(frequency, lambda: BMD.absolute_max_moment(case))
+            env, gov = at_frequency(frequency, lambda: BMD.envelopes(case))
+            expected = env[:, BMD.envelope_labels.index("BME (N mm)")].max()
+            assert abs(moment - expected) <= tolerance * expected, (frequency, case)
+
+if __name__ == "__main__":
+    test_analytic_envelopes_match_sweep()
+    test_absolute_max_moment_matches_BME()
+    print("sample frequencies %s: ok" % sample_frequencies)
@@ -0,0 +1,41 @@
+import numpy
+import BMD
+import ContinuousBeam
+
+#checks the banded stiffness solution of ContinuousBeam against closed-form reactions
+#python -m pytest test_ContinuousBeam.py, or python test_ContinuousBeam.py
+
+#how close the reactions to a 1 N load have to be (N)
+tolerance = 1e-10
+
+#with two supports the beam is determinate, so it has to give the same reactions as Beam (overhangs included)
+def test_two_supports_match_Beam():
+    beam = BMD.Beam(1250, (25, 1225))
+    continuous = ContinuousBeam.ContinuousBeam(1250, (25, 1225))
+    x = numpy.linspace(-10, 1260, 509)
+    assert numpy.abs(continuous.reactions(x) - beam.reactions(x)).max() <= tolerance
+
+#reactions (first, middle, last support) of two equal spans L (constant EI) to a 1 N load a from the first support,
+#from the three-moment equation: the moment over the middle support is M = -a (L^2 - a^2) / (4 L^2)
+#loads in the second span are the mirror image
+def three_moment_reactions(a, L):
+    mirror = a > L
+    if mirror: a = 2 * L - a
+    M = -a * (L ** 2 - a ** 2) / (4 * L ** 2)
+    first = (L - a) / L + M / L
+    last = M / L
+    out = [first, 1 - first - last, last]
+    return out[::-1] if mirror else out
+
+def test_two_equal_spans_match_three_moment():
+    L = 600
+    continuous = ContinuousBeam.ContinuousBeam(1250, (25, 25 + L, 25 + 2 * L))
+    #between the supports, on stations and between them
+    x = numpy.linspace(25, 25 + 2 * L, 481)
+    expected = numpy.array([three_moment_reactions(a, L) for a in (x - 25).tolist()])
+    assert numpy.abs(continuous.reactions(x) - expected).max() <= tolerance
+
+if __name__ == "__main__":
+    test_two_supports_match_Beam()
+    test_two_equal_spans_match_three_moment()
+    print("ok")
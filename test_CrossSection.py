@@ -0,0 +1,69 @@
+import glob
+import os
+import numpy
+import CrossSection
+
+#checks that a Section edited one rectangle at a time (running sums, profile updated in place)
+#agrees with a Section built from scratch from the same rectangles
+#python -m pytest test_CrossSection.py, or python test_CrossSection.py
+
+folder = os.path.dirname(os.path.abspath(__file__))
+design_files = sorted(glob.glob(os.path.join(folder, "Design Iterations", "*.txt")))
+
+#random edits per design file, and how close (relative) every property has to stay
+edits = 200
+tolerance = 1e-12
+
+#random rectangle [x, y, w, h] somewhere around the section
+def random_rect(rng, bounds):
+    left, bottom, right, top = bounds
+    w, h = rng.uniform(0.5, 0.5 * (right - left)), rng.uniform(0.5, 0.5 * (top - bottom))
+    return [rng.uniform(left, right), rng.uniform(bottom, top), w, h]
+
+#one random edit: append, extend, replace or delete (never down to an empty section)
+def random_edit(rng, section, bounds):
+    kind = rng.integers(4)
+    if kind == 0 or len(section) < 3: section.append(random_rect(rng, bounds))
+    elif kind == 1: section.extend([random_rect(rng, bounds) for _ in range(rng.integers(1, 4))])
+    elif kind == 2: section[int(rng.integers(len(section)))] = random_rect(rng, bounds)
+    else: del section[int(rng.integers(len(section)))]
+
+#a - b is within tolerance of scale
+def close(a, b, scale):
+    return numpy.all(numpy.abs(numpy.asarray(a) - numpy.asarray(b)) <= tolerance * scale)
+
+def check_edits(file_name, seed=0):
+    rng = numpy.random.default_rng(seed)
+    section = CrossSection.get_section(file_name)
+    bounds = section.bounds
+
+    for _ in range(edits):
+        #the profile has to be cached before the edit to be updated in place
+        section.profile
+        random_edit(rng, section, bounds)
+        fresh = CrossSection.Section(section.rects)
+
+        assert close(section.area, fresh.area, fresh.area)
+        assert close(section.ybar, fresh.ybar, fresh.bounds[3] - fresh.bounds[1])
+        assert close(section.I, fresh.I, fresh.I)
+
+        left, bottom, right, top = fresh.bounds
+        heights = rng.uniform(bottom, top, 50)
+        Q = fresh.profile.Q(heights)
+        scale = max(numpy.abs(Q).max(), fresh.area * (top - bottom))
+        assert close(section.profile.Q(heights), Q, scale)
+        assert close(section.profile.b(heights), fresh.profile.b(heights), right - left)
+
+        #the worst Q / b (the height itself can move between ties)
+        height, Q_c, b_c = section.profile.critical()
+        height2, Q_c2, b_c2 = fresh.profile.critical()
+        assert close(Q_c / b_c, Q_c2 / b_c2, Q_c2 / b_c2)
+
+def test_incremental_edits_match_rebuild():
+    assert design_files
+    for file_name in design_files:
+        check_edits(file_name)
+
+if __name__ == "__main__":
+    test_incremental_edits_match_rebuild()
+    print("%d files, %d edits each: ok" % (len(design_files), edits))
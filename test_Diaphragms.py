@@ -0,0 +1,44 @@
+import os
+import numpy
+import BMD
+import CrossSection
+import Diaphragms
+import optimize
+
+#checks that the cached panel capacities give the same min FOS as evaluating the whole bridge with that diaphragm spacing
+#python -m pytest test_Diaphragms.py, or python test_Diaphragms.py
+
+folder = os.path.dirname(os.path.abspath(__file__))
+
+#random layouts checked, and how close (relative) the two min FOS have to be
+layouts = 30
+tolerance = 1e-12
+
+#random layout: the fixed diaphragms plus 0 - 12 more anywhere between the support pairs
+def random_layout(rng):
+    lo, hi = Diaphragms.fixed[2], Diaphragms.fixed[3]
+    inside = rng.choice(numpy.arange(lo + 1, hi), rng.integers(0, 13), replace=False)
+    return sorted(Diaphragms.fixed + inside.tolist())
+
+def test_panel_capacity_matches_FOS_array():
+    rng = numpy.random.default_rng(0)
+    sections = [CrossSection.get_section(os.path.join(folder, "Design Iterations", "design6_%s.txt" % k)) for k in ("supports", "edge", "middle")]
+    ENV, GOV = BMD.cached_envelopes(analytic=True)
+    SFD_ENV, BMD_ENV = ENV[:1250, 2], ENV[:1250, 5]
+    capacity = Diaphragms.PanelCapacity(SFD_ENV, BMD_ENV, *sections)
+
+    for _ in range(layouts):
+        layout = random_layout(rng)
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            fos, labels = optimize.FOS_array(SFD_ENV, BMD_ENV, *sections, spacing=layout)
+        #leaving out position 0, as FOS_whole_bridge does
+        expected = fos[1:].min()
+        assert abs(capacity.fos(layout) - expected) <= tolerance * expected, layout
+
+        #case 4 on its own too, as it is the only mode the layout changes
+        case4 = fos[1:, labels.index("CASE 4 PLATE BUCKLING")].min()
+        assert abs(min(capacity.panels(layout)) - case4) <= tolerance * case4, layout
+
+if __name__ == "__main__":
+    test_panel_capacity_matches_FOS_array()
+    print("%d layouts: ok" % layouts)